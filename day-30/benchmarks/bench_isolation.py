@@ -0,0 +1,161 @@
+# benchmarks/bench_isolation.py
+"""
+Checks that one session stuck in slow upstream calls does not raise the
+latency of other sessions on the same worker.
+
+The provider SDKs are replaced with in-process fakes: session "slow" gets
+a 2 s AssemblyAI handshake and 2 s SerpAPI searches, session "fast" gets
+instant providers. The fast session's time from final transcript to first
+audio frame is measured alone and next to the slow session.
+
+    python benchmarks/bench_isolation.py
+
+Exits non-zero when the slow session adds more than TOLERANCE_MS.
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Fake audio must not end up in the TTS cache that real sessions are served from
+os.environ["TTS_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import config  # noqa: E402
+from main import app  # noqa: E402
+from services import clients, llm, stt  # noqa: E402
+
+SLOW_SECONDS = 2.0
+TURNS = 10
+TOLERANCE_MS = 100
+# Inbound audio is re-framed to STT_FRAME_MS; fake frames are padded to one frame
+FRAME_BYTES = stt.SAMPLE_RATE * config.STT_FRAME_MS // 1000 * 2
+# Seconds to wait for a server message before failing instead of hanging
+RECEIVE_TIMEOUT = 10
+
+
+class FakeStreamingClient:
+    """Turns b"FINAL:<text>" audio frames, padded with zero bytes, into end-of-turn events."""
+
+    def __init__(self, options):
+        self.api_key = options.api_key
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def connect(self, params):
+        if self.api_key == "slow":
+            time.sleep(SLOW_SECONDS)
+
+    def set_params(self, params):
+        pass
+
+    def stream(self, data):
+        data = bytes(data).rstrip(b"\0")
+        if data.startswith(b"FINAL:"):
+            event = SimpleNamespace(transcript=data[6:].decode(), end_of_turn=True, turn_is_formatted=True)
+            self.handlers[stt.StreamingEvents.Turn](self, event)
+
+    def disconnect(self, terminate=False):
+        pass
+
+
+class FakeGoogleSearch:
+    def __init__(self, params):
+        self.api_key = params["api_key"]
+
+    def get_dict(self):
+        if self.api_key == "slow":
+            time.sleep(SLOW_SECONDS)
+        return {"organic_results": [{"snippet": "Sunny."}]}
+
+
+class FakeMurf:
+    def __init__(self, api_key=None, **kwargs):
+        self.text_to_speech = self
+
+    def stream(self, text, **kwargs):
+        yield b"RIFF" + text.encode()
+
+
+async def fake_stream_llm_response(user_query, history, api_key):
+    yield "Here you go."
+
+
+def install_fakes():
+    # Every turn repeats the same query; keep the turn gate from merging or dropping them
+    config.TURN_COALESCE_WINDOW = 0
+    config.TURN_DUPLICATE_TTL = 0
+    # The fake frames carry text, not speech; the VAD would hold them back as silence
+    config.VAD_ENABLED = False
+    stt.StreamingClient = FakeStreamingClient
+    clients.google_search = FakeGoogleSearch
+    clients.murf = FakeMurf
+    llm.stream_llm_response = fake_stream_llm_response
+
+
+def receive_json(ws) -> dict:
+    """ws.receive_json() that fails the bench when nothing arrives within RECEIVE_TIMEOUT."""
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(message=ws.receive_json()), daemon=True)
+    reader.start()
+    reader.join(RECEIVE_TIMEOUT)
+    if reader.is_alive():
+        print(f"FAIL: no message from the server within {RECEIVE_TIMEOUT} s")
+        # The test client's portal would wait on the stuck session; exit without tearing it down
+        os._exit(1)
+    return result["message"]
+
+
+def run_session(client, key, query, turns, latencies=None, stop=None):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "config", "keys": {k: key for k in ("assemblyai", "gemini", "serpapi", "murf")}}))
+        for _ in range(turns):
+            if stop is not None and stop.is_set():
+                break
+            started = time.perf_counter()
+            ws.send_bytes(f"FINAL:{query}".encode().ljust(FRAME_BYTES, b"\0"))
+            while receive_json(ws)["type"] != "audio":
+                pass
+            if latencies is not None:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+
+def measure(client, with_slow_session):
+    latencies, stop = [], threading.Event()
+    slow = None
+    if with_slow_session:
+        slow = threading.Thread(target=run_session, args=(client, "slow", "What's the weather today?", 1000, None, stop))
+        slow.start()
+        time.sleep(0.1)  # Let the slow session start its handshake
+    run_session(client, "fast", "Tell me a joke.", TURNS, latencies)
+    stop.set()
+    if slow:
+        slow.join()
+    return latencies
+
+
+def main():
+    install_fakes()
+    with TestClient(app) as client:
+        alone = measure(client, with_slow_session=False)
+        contended = measure(client, with_slow_session=True)
+
+    baseline, loaded = statistics.median(alone), statistics.median(contended)
+    print(f"fast session alone          p50 {baseline:8.1f} ms   max {max(alone):8.1f} ms")
+    print(f"fast session + slow session p50 {loaded:8.1f} ms   max {max(contended):8.1f} ms")
+    if max(contended) - baseline > TOLERANCE_MS:
+        print("FAIL: the slow session is blocking the event loop")
+        sys.exit(1)
+    print("OK: sessions are isolated")
+
+
+if __name__ == "__main__":
+    main()
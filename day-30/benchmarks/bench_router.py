@@ -0,0 +1,91 @@
+# benchmarks/bench_router.py
+"""
+Compares the local search router against the Gemini yes/no router on two
+labeled corpora:
+
+- routing_corpus.jsonl, which the local router's features were written
+  against, so its accuracy there is in-sample;
+- routing_heldout.jsonl, which must never be used to tune the features,
+  so its accuracy is the one to quote.
+
+    python benchmarks/bench_router.py
+
+For each corpus it also reports how many queries fall below
+ROUTER_CONFIDENCE_THRESHOLD and would be deferred to Gemini. The LLM
+router is only measured when GEMINI_API_KEY is set.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from services import llm, local_router  # noqa: E402
+
+CORPORA = {
+    "in-sample": Path(__file__).resolve().parent / "routing_corpus.jsonl",
+    "held-out": Path(__file__).resolve().parent / "routing_heldout.jsonl",
+}
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(name, decide, corpus, repeat=1):
+    correct, latencies, mistakes = 0, [], []
+    for item in corpus:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            decision = decide(item["query"])
+            latencies.append((time.perf_counter() - started) * 1e6)
+        if decision == item["search"]:
+            correct += 1
+        else:
+            mistakes.append(item["query"])
+    latencies.sort()
+    print(f"{name:<22} accuracy {correct / len(corpus):6.1%}   "
+          f"p50 {statistics.median(latencies):10.1f} us   "
+          f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:10.1f} us")
+    return mistakes
+
+
+def deferral(corpus, threshold):
+    """Share of queries deferred to Gemini, and accuracy on the ones decided locally."""
+    decisions = [(local_router.classify(item["query"]), item["search"]) for item in corpus]
+    local = [(decision.search, label) for decision, label in decisions if decision.confidence >= threshold]
+    accuracy = sum(search == label for search, label in local) / len(local) if local else 0.0
+    print(f"{'  threshold ' + str(threshold):<22} deferred {1 - len(local) / len(corpus):6.1%}   "
+          f"accuracy when decided locally {accuracy:6.1%}")
+
+
+def main():
+    api_key = os.getenv("GEMINI_API_KEY")
+    for name, path in CORPORA.items():
+        corpus = load_corpus(path)
+        print(f"{name}: {len(corpus)} labeled queries")
+
+        local_router._cache.clear()
+        mistakes = evaluate("local (cold cache)", lambda q: local_router.classify(q).search, corpus)
+        evaluate("local (warm cache)", lambda q: local_router.classify(q).search, corpus, repeat=100)
+        deferral(corpus, config.ROUTER_CONFIDENCE_THRESHOLD)
+
+        if api_key:
+            evaluate("gemini yes/no", lambda q: llm.should_search_web(q, api_key), corpus)
+        else:
+            print("gemini yes/no          skipped (GEMINI_API_KEY not set)")
+
+        if mistakes:
+            print("Local router mistakes:")
+            for query in mistakes:
+                print(f"  {query}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
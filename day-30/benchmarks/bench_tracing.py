@@ -0,0 +1,51 @@
+# benchmarks/bench_tracing.py
+"""
+Measures the per-span cost of services/tracing on the hot path.
+
+    python benchmarks/bench_tracing.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import tracing  # noqa: E402
+
+ITERATIONS = 20_000
+
+
+def per_call_ns(fn):
+    started = time.perf_counter_ns()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter_ns() - started) / ITERATIONS
+
+
+def span():
+    with tracing.start_span("tts", chars=42) as s:
+        s.set(bytes=1024)
+
+
+def event():
+    tracing.event("audio_sent", bytes=1024)
+
+
+def main():
+    print(f"{'no active trace, span':<28} {per_call_ns(span):8.0f} ns")
+    print(f"{'no active trace, event':<28} {per_call_ns(event):8.0f} ns")
+
+    # A fresh trace per batch keeps the span list at a realistic size
+    def traced(fn):
+        def run():
+            tracing.current_trace.set(tracing.Trace("bench", 1))
+            for _ in range(50):
+                fn()
+        return run
+
+    print(f"{'active trace, span':<28} {per_call_ns(traced(span)) / 50:8.0f} ns")
+    print(f"{'active trace, event':<28} {per_call_ns(traced(event)) / 50:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
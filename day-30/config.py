@@ -0,0 +1,153 @@
+# config.py
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# API keys still arrive per session from the browser; these are server-side tunables only.
+
+# Sentences waiting for TTS before the LLM stream is paused
+SENTENCE_QUEUE_SIZE = int(os.getenv("SENTENCE_QUEUE_SIZE", "4"))
+
+# Sentences of one turn synthesized concurrently against Murf
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "3"))
+
+# Murf calls in flight for a single websocket session, across all of its turns
+TTS_SESSION_CAP = int(os.getenv("TTS_SESSION_CAP", "4"))
+
+# Run the search router, the plain answer and the SerpAPI prefetch concurrently
+# and keep whichever branch the router picks. Trades wasted upstream calls for latency.
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "false").lower() == "true"
+
+# "local" decides in-process from lexical features, "llm" asks Gemini every turn
+SEARCH_ROUTER = os.getenv("SEARCH_ROUTER", "local")
+# Local decisions less confident than this (0..1) are deferred to the Gemini router
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.3"))
+
+# Words in a partial transcript that interrupt the agent while it is answering (0 disables)
+BARGE_IN_MIN_WORDS = int(os.getenv("BARGE_IN_MIN_WORDS", "3"))
+# Seconds the client may lag behind the server's playback estimate (network, decoding, scheduling lead)
+PLAYBACK_MARGIN = float(os.getenv("PLAYBACK_MARGIN", "0.3"))
+
+# Per-turn latency traces: kept in memory for /debug/turns and appended to a rotating JSONL file
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.path.dirname(__file__), "traces", "turns.jsonl")) if TRACE_ENABLED else None
+TRACE_RING_SIZE = int(os.getenv("TRACE_RING_SIZE", "100"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
+
+
+def _pool_settings(name: str, workers: int, queue: int, policy: str, deadline: float):
+    prefix = f"POOL_{name.upper()}_"
+    return {
+        "max_workers": int(os.getenv(prefix + "WORKERS", str(workers))),
+        "max_queue": int(os.getenv(prefix + "QUEUE", str(queue))),
+        "policy": os.getenv(prefix + "POLICY", policy),
+        "deadline": float(os.getenv(prefix + "DEADLINE", str(deadline))),
+    }
+
+
+# One pool per upstream provider: size, bounded submission queue and what to do
+# once it is full ("wait" up to the deadline, "shed" the call, or "degrade" to no result).
+# Gemini is called through its native async API, so "llm" only limits concurrency.
+PROVIDER_POOLS = {
+    "stt": _pool_settings("stt", workers=8, queue=16, policy="wait", deadline=5.0),
+    "llm": _pool_settings("llm", workers=16, queue=32, policy="wait", deadline=10.0),
+    "search": _pool_settings("search", workers=4, queue=8, policy="shed", deadline=0.0),
+    "tts": _pool_settings("tts", workers=16, queue=32, policy="degrade", deadline=0.0),
+}
+
+# End-of-turn fragments closer together than this (seconds) are merged into one LLM request
+TURN_COALESCE_WINDOW = float(os.getenv("TURN_COALESCE_WINDOW", "0.3"))
+# A turn this similar (0..1) to one accepted within the TTL (seconds) is dropped as a duplicate
+TURN_DUPLICATE_TTL = float(os.getenv("TURN_DUPLICATE_TTL", "3.0"))
+TURN_DUPLICATE_SIMILARITY = float(os.getenv("TURN_DUPLICATE_SIMILARITY", "0.9"))
+
+# Event-loop watchdog; can be switched off per worker process
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+# Stalls longer than this (seconds) are logged with a stack sample of the loop thread
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.25"))
+
+# Synthesized audio keyed on text and voice. Sentences up to TTS_CACHE_MAX_CHARS are kept
+# in memory; only fillers, the fixed fallback replies and sentences up to
+# TTS_CACHE_DISK_MAX_CHARS (greetings, short answers) are also written to a directory
+# that survives restarts. Longer sentences are one-offs and bypass the cache.
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache", "tts"))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", "200"))
+TTS_CACHE_DISK_MAX_CHARS = int(os.getenv("TTS_CACHE_DISK_MAX_CHARS", "40"))
+
+# Provider clients are shared per API key: at most this many keys are kept, each
+# closed after being idle for CLIENT_IDLE_TTL seconds
+CLIENT_REGISTRY_SIZE = int(os.getenv("CLIENT_REGISTRY_SIZE", "256"))
+CLIENT_IDLE_TTL = float(os.getenv("CLIENT_IDLE_TTL", "300"))
+# Keep-alive connections per client
+CLIENT_MAX_CONNECTIONS = int(os.getenv("CLIENT_MAX_CONNECTIONS", "8"))
+
+# "http" streams each sentence over its own Murf request, "websocket" multiplexes
+# sentences as contexts over a few long-lived stream-input websockets per API key
+TTS_BACKEND = os.getenv("TTS_BACKEND", "http")
+MURF_WS_CONNECTIONS = int(os.getenv("MURF_WS_CONNECTIONS", "2"))
+# Contexts open at once on one websocket before another connection is used
+MURF_WS_MAX_CONTEXTS = int(os.getenv("MURF_WS_MAX_CONTEXTS", "5"))
+# Seconds to wait for the websocket handshake or for the next audio chunk
+MURF_WS_TIMEOUT = float(os.getenv("MURF_WS_TIMEOUT", "10"))
+
+# Play a short pre-synthesized acknowledgement on web-search turns when no real
+# audio has been sent this many seconds after the user finished speaking
+FILLERS_ENABLED = os.getenv("FILLERS_ENABLED", "true").lower() == "true"
+FILLER_BUDGET = float(os.getenv("FILLER_BUDGET", "1.0"))
+
+# Murf audio is resampled to this rate (Hz) and downmixed to mono before it is sent;
+# the browser plays it through a 16 kHz AudioContext. 0 sends Murf's audio as is.
+OUTPUT_SAMPLE_RATE = int(os.getenv("OUTPUT_SAMPLE_RATE", "16000"))
+
+# Optional copy of every turn's outgoing audio, written off the latency path by a
+# background thread; the oldest sessions are deleted once ARCHIVE_QUOTA_BYTES is exceeded
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), "archive"))
+ARCHIVE_QUOTA_BYTES = int(os.getenv("ARCHIVE_QUOTA_BYTES", str(1024 * 1024 * 1024)))
+# Chunks waiting for the archive writer before new ones are dropped
+ARCHIVE_QUEUE_SIZE = int(os.getenv("ARCHIVE_QUEUE_SIZE", "1024"))
+
+# Seconds the Murf voice catalogue behind /voices is served from memory before it is
+# revalidated in the background; the stale copy is served meanwhile and if Murf is down
+VOICES_TTL = float(os.getenv("VOICES_TTL", "3600"))
+
+# Voice activity detection in front of AssemblyAI: silence is not streamed, apart from a
+# short silent frame every VAD_KEEPALIVE_INTERVAL seconds. A frame is speech above
+# VAD_THRESHOLD_DB dBFS, or within VAD_ZCR_MARGIN_DB of it with a zero-crossing rate
+# above VAD_ZCR_THRESHOLD. VAD_HANGOVER must outlast AssemblyAI's end-of-turn silence.
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-50"))
+VAD_ZCR_THRESHOLD = float(os.getenv("VAD_ZCR_THRESHOLD", "0.25"))
+VAD_ZCR_MARGIN_DB = float(os.getenv("VAD_ZCR_MARGIN_DB", "10"))
+VAD_HANGOVER = float(os.getenv("VAD_HANGOVER", "1.5"))
+# Seconds of audio before speech onset that are sent along with it
+VAD_PREROLL = float(os.getenv("VAD_PREROLL", "0.3"))
+VAD_KEEPALIVE_INTERVAL = float(os.getenv("VAD_KEEPALIVE_INTERVAL", "1.0"))
+
+# Inbound audio is re-framed to this many milliseconds per message to AssemblyAI,
+# whatever chunk sizes the browser sends; AssemblyAI accepts 50 to 1000 ms
+STT_FRAME_MS = int(os.getenv("STT_FRAME_MS", "50"))
+# A frame whose first byte waited longer than this (seconds) for the rest is counted late
+STT_FRAME_LATE_AFTER = float(os.getenv("STT_FRAME_LATE_AFTER", "0.5"))
+
+# Connected AssemblyAI sessions kept warm per key, so a new websocket skips the
+# handshake. The pool holds one session per connection expected to arrive within
+# STT_POOL_MAX_IDLE seconds, judged from the last STT_POOL_WINDOW seconds, up to
+# STT_POOL_MAX_SIZE; unused sessions are replaced after STT_POOL_MAX_IDLE seconds.
+# Off by default: every warm session is billed streaming time while it waits.
+STT_POOL_ENABLED = os.getenv("STT_POOL_ENABLED", "false").lower() == "true"
+STT_POOL_MAX_SIZE = int(os.getenv("STT_POOL_MAX_SIZE", "2"))
+STT_POOL_MAX_IDLE = float(os.getenv("STT_POOL_MAX_IDLE", "30"))
+STT_POOL_WINDOW = float(os.getenv("STT_POOL_WINDOW", "300"))
+
+# Seconds of speech held while the AssemblyAI session connects; older audio is dropped
+STT_PREBUFFER_SECONDS = float(os.getenv("STT_PREBUFFER_SECONDS", "5"))
+# Once connected, the held audio is sent at this multiple of real time (0 = all at once)
+STT_PREBUFFER_FLUSH_SPEED = float(os.getenv("STT_PREBUFFER_FLUSH_SPEED", "10"))
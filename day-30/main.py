@@ -1,21 +1,41 @@
 # main.py
-from fastapi import FastAPI, Request, WebSocket
+from fastapi import FastAPI, Header, Request, WebSocket
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
-import base64
-import re
 import json
+import threading
+import time
+import uuid
+from typing import Optional
 
 # Import services and config
-from services import stt, llm, tts
+import config
+from services import stt, llm, tts, audio, metrics, routing, tracing, loop_monitor, fillers, framing, archive, voices, vad, ingest, stt_pool, playback
+from services.synthesis import SynthesisStage
+from services.turn_gate import TurnGate
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = FastAPI()
 
+# Measures event-loop lag and logs a stack sample whenever something blocks the loop
+if config.LOOP_MONITOR_ENABLED:
+    loop_monitor.install(app, config.LOOP_MONITOR_INTERVAL, config.LOOP_STALL_THRESHOLD)
+
+barge_ins = metrics.counter("barge_ins")
+
+# Recent turn traces for /debug/turns, also appended to a rotating JSONL file
+trace_recorder = tracing.TraceRecorder(
+    config.TRACE_FILE, config.TRACE_RING_SIZE, config.TRACE_MAX_BYTES, config.TRACE_BACKUP_COUNT
+)
+audio_archive = archive.AudioArchive(
+    config.ARCHIVE_DIR, config.ARCHIVE_QUOTA_BYTES, config.ARCHIVE_QUEUE_SIZE
+) if config.ARCHIVE_ENABLED else None
+
 # Mount static files for CSS/JS
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -27,6 +47,38 @@ async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/debug/metrics")
+async def debug_metrics():
+    """Returns the in-process pipeline metrics."""
+    return metrics.snapshot()
+
+
+@app.get("/debug/turns")
+async def debug_turns(limit: int = 20):
+    """Returns the span trees of the most recent turns, newest first."""
+    return trace_recorder.recent_turns(limit)
+
+
+@app.get("/voices")
+async def get_voices(
+    locale: Optional[str] = None,
+    gender: Optional[str] = None,
+    style: Optional[str] = None,
+    api_key: Optional[str] = Header(None, alias="api-key"),
+):
+    """
+    Returns the Murf voices, optionally filtered by locale, gender and style.
+    The Murf key is only needed while the catalogue has not been loaded yet.
+    """
+    try:
+        found = await voices.catalog.voices(api_key, locale, gender, style)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Failed to fetch voices: {e}"})
+    return {"voices": found, "stale": voices.catalog.stale}
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Handles WebSocket connection for real-time transcription and voice response."""
@@ -36,65 +88,308 @@ async def websocket_endpoint(websocket: WebSocket):
     loop = asyncio.get_event_loop()
     chat_history = []
     api_keys = {}
+    # Caps Murf calls in flight for this session across overlapping turns
+    tts_session_slots = asyncio.Semaphore(config.TTS_SESSION_CAP)
+
+    # The task running the current turn; a new turn cancels it (barge-in)
+    current_turn = None
+    # (text, received_at, playback clock) of the turn started last
+    current_request = None
+    # (playback clock, model reply in chat_history) of the last completed turn, whose audio may still be playing
+    last_reply = None
+    session_id = uuid.uuid4().hex[:8]
+    turn_count = 0
+    # Switched to binary frames if the client asks for them in its config message
+    audio_channel = framing.AudioChannel(websocket)
+
+    async def handle_transcript(text: str, received_at: int, clock: playback.PlaybackClock):
+        """Streams the LLM reply into TTS sentence by sentence and sends the audio back."""
+        nonlocal turn_count, last_reply
+        turn_count += 1
+        turn_id = turn_count
+        # The client is told to drop the previous turn's audio below
+        last_reply = None
+        trace = None
+        if config.TRACE_ENABLED:
+            # Everything awaited by this task, and the tasks it starts, records into this trace
+            trace = tracing.Trace(session_id, turn_count, start=received_at, chars=len(text))
+            trace.event("stt_final", at=received_at)
+            tracing.current_trace.set(trace)
 
-    async def handle_transcript(text: str):
-        """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
+        # The user spoke again: drop whatever audio of the previous turn is still queued
+        await websocket.send_json({"type": "flush"})
         await websocket.send_json({"type": "final", "text": text})
-        try:
-            # 1. Decide whether to search the web
-            if llm.should_search_web(text, api_keys.get("gemini")):
-                full_response, updated_history = llm.get_web_response(text, chat_history, api_keys.get("gemini"), api_keys.get("serpapi"))
-            else:
-                full_response, updated_history = llm.get_llm_response(text, chat_history, api_keys.get("gemini"))
-            
-            # Update history for the next turn
-            chat_history.clear()
-            chat_history.extend(updated_history)
-
-            # Send the full text response to the UI
-            await websocket.send_json({"type": "assistant", "text": full_response})
-
-            # 2. Split the response into sentences
-            sentences = re.split(r'(?<=[.?!])\s+', full_response.strip())
-            
-            # 3. Process each sentence for TTS and stream audio back
-            for sentence in sentences:
-                if sentence.strip():
-                    # Run the blocking TTS function in a separate thread
-                    audio_bytes = await loop.run_in_executor(
-                        None, tts.speak, sentence.strip(), api_keys.get("murf")
-                    )
-                    if audio_bytes:
-                        b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
-                        await websocket.send_json({"type": "audio", "b64": b64_audio})
+        # Bounded so a fast LLM cannot run arbitrarily far ahead of TTS
+        sentence_queue = asyncio.Queue(maxsize=config.SENTENCE_QUEUE_SIZE)
+        # Lets TTS calls already running in worker threads stop early
+        stop_synthesis = threading.Event()
+        prompt = None
+        sentences = []
+        spoken = []
+
+        async def send_to_client(audio_chunk: audio.PcmChunk, sentence: str = None):
+            await audio_channel.send(turn_id, audio_chunk)
+            clock.sent(audio.duration(audio_chunk), sentence)
+            if audio_archive:
+                audio_archive.append(session_id, turn_id, audio_chunk)
+
+        async def play_filler(phrase: str, audio_chunk: audio.PcmChunk):
+            await send_to_client(audio_chunk)
+
+        # Covers the silence of a web search with a pre-synthesized acknowledgement
+        filler = fillers.FillerPolicy(play_filler, received_at, config.FILLER_BUDGET) if config.FILLERS_ENABLED else None
+
+        async def llm_worker():
+            """Streams the LLM reply and pushes complete sentences to the TTS queue."""
+            nonlocal prompt
+            try:
+                # 1. Decide whether to search the web and start the reply stream
+                answer = await routing.answer(
+                    text, chat_history, api_keys,
+                    speculative=config.SPECULATIVE_ROUTING,
+                    router=config.SEARCH_ROUTER,
+                    confidence_threshold=config.ROUTER_CONFIDENCE_THRESHOLD,
+                    on_search=filler.arm if filler else None,
+                )
+                prompt = answer.prompt
+
+                # 2. Forward each sentence as soon as Gemini completes it
+                try:
+                    async for sentence in llm.stream_sentences(answer.chunks):
+                        sentences.append(sentence)
+                        await sentence_queue.put(sentence)
+                except llm.ReplyFailed:
+                    # Tell the user, but keep the failed exchange out of the history
+                    prompt = None
+                    if not sentences:
+                        sentences.append(llm.ERROR_RESPONSE)
+                        await sentence_queue.put(llm.ERROR_RESPONSE)
 
+                # Send the full text response to the UI
+                await websocket.send_json({"type": "assistant", "text": " ".join(sentences)})
+            except Exception:
+                await sentence_queue.put(None)  # Unblock the TTS worker
+                raise
+            await sentence_queue.put(None)  # Signal that the LLM is done
+
+        async def synthesize(sentence: str):
+            with tracing.start_span("tts", chars=len(sentence)) as span:
+                size = 0
+                # Murf audio is read in the TTS pool and forwarded as each chunk arrives
+                async for chunk in tts.stream_speech(sentence, api_keys.get("murf"), stop_synthesis):
+                    if not size:
+                        span.event("first_byte")
+                    size += len(chunk.data)
+                    yield chunk
+                span.set(bytes=size)
+
+        async def send_audio(sentence: str, audio_chunk: audio.PcmChunk):
+            if filler:
+                filler.audio_started()
+            await send_to_client(audio_chunk, sentence)
+            tracing.event("audio_sent", bytes=len(audio_chunk.data))
+
+        def sentence_sent(sentence: str):
+            spoken.append(sentence)
+            clock.sentence_done()
+
+        async def tts_worker():
+            """Synthesizes queued sentences concurrently and streams their audio back in order as it arrives."""
+            stage = SynthesisStage(synthesize, send_audio, config.TTS_CONCURRENCY, tts_session_slots, sentence_sent)
+            try:
+                while True:
+                    sentence = await sentence_queue.get()
+                    if sentence is None:
+                        break
+                    await stage.submit(sentence)
+                await stage.drain()
+            except BaseException:
+                stage.cancel()
+                raise
+
+        completed = False
+        status = "error"
+        try:
+            await asyncio.gather(llm_worker(), tts_worker())
+            await audio_channel.end_turn(turn_id)
+            completed = True
+            status = "completed"
+        except asyncio.CancelledError:
+            stop_synthesis.set()
+            status = "cancelled"
+            logging.info("Turn cancelled before it finished.")
+            raise
         except Exception as e:
             logging.error(f"Error in LLM/TTS pipeline: {e}")
             await websocket.send_json({"type": "llm", "text": "Sorry, I encountered an error."})
+        finally:
+            if filler:
+                filler.cancel()
+            if audio_archive:
+                audio_archive.close_turn(session_id, turn_id)
+            if trace:
+                trace.root.finish(status=status, spoken_sentences=len(spoken))
+                trace_recorder.record(trace)
+            # An interrupted turn only keeps what the user actually heard
+            reply = sentences if completed else clock.heard()
+            if prompt is not None and reply:
+                updated_history = llm.extend_history(chat_history, prompt, " ".join(reply))
+                chat_history.clear()
+                chat_history.extend(updated_history)
+                if completed:
+                    last_reply = (clock, updated_history[-1])
+
+    def interrupt_turn():
+        """
+        Stops the agent talking: cancels the in-flight turn, including its
+        pending LLM and TTS work, or, once it has finished, cuts the reply
+        committed to the history down to what was heard if its audio may
+        still be playing. Returns whether there was anything to stop.
+        """
+        nonlocal last_reply
+        if current_turn is not None and not current_turn.done():
+            current_turn.cancel()
+            barge_ins.inc()
+            return True
+        if last_reply is None:
+            return False
+        clock, reply = last_reply
+        last_reply = None
+        if not clock.playing():
+            return False
+        truncate_reply(reply, clock.heard())
+        barge_ins.inc()
+        return True
+
+    def truncate_reply(reply: dict, heard: list):
+        """Replaces a committed model reply with the sentences heard, or drops the exchange if none were."""
+        index = next((i for i, message in enumerate(chat_history) if message is reply), None)
+        if index is None:
+            return
+        if heard:
+            reply["parts"] = [" ".join(heard)]
+        else:
+            # The user message before it goes too, so roles keep alternating
+            del chat_history[index - 1:index + 1]
+
+    def unheard_request():
+        """(text, received_at) of the in-flight turn if none of its reply has been heard yet, else None."""
+        if current_turn is None or current_turn.done():
+            return None
+        text, received_at, clock = current_request
+        return None if clock.heard() else (text, received_at)
 
+    def start_turn(text: str, received_at: int):
+        nonlocal current_turn, current_request
+        unheard = unheard_request()
+        interrupt_turn()
+        if unheard:
+            # The user was still talking: the cancelled turn was the start of this one
+            text = f"{unheard[0]} {text}"
+            received_at = unheard[1]
+        clock = playback.PlaybackClock(config.PLAYBACK_MARGIN)
+        current_request = (text, received_at, clock)
+        current_turn = asyncio.create_task(handle_transcript(text, received_at, clock))
+
+    # Merges fragmented end-of-turn events and drops duplicate transcripts
+    turn_gate = TurnGate(
+        start_turn,
+        window=config.TURN_COALESCE_WINDOW,
+        duplicate_ttl=config.TURN_DUPLICATE_TTL,
+        similarity=config.TURN_DUPLICATE_SIMILARITY,
+    )
+
+    def barge_in(text: str):
+        if len(text.split()) < config.BARGE_IN_MIN_WORDS:
+            return
+        unheard = unheard_request()
+        if interrupt_turn():
+            logging.info(f"Barge-in on partial transcript: {text}")
+            if unheard:
+                # Nothing was answered yet, so the user's words lead into what they are saying now
+                turn_gate.carry(*unheard)
+            asyncio.create_task(websocket.send_json({"type": "flush"}))
 
     def on_final_transcript(text: str):
         logging.info(f"Final transcript received: {text}")
-        asyncio.run_coroutine_threadsafe(handle_transcript(text), loop)
+        loop.call_soon_threadsafe(turn_gate.submit, text, time.perf_counter_ns())
+
+    def on_partial_transcript(text: str):
+        if config.BARGE_IN_MIN_WORDS > 0:
+            loop.call_soon_threadsafe(barge_in, text)
 
     try:
-        # The first message from the client should be the API keys
-        config_data = await websocket.receive_text()
-        config = json.loads(config_data)
-        if config.get("type") == "config":
-            api_keys = config.get("keys", {})
-
-        transcriber = stt.AssemblyAIStreamingTranscriber(
-            on_final_callback=on_final_transcript, 
-            api_key=api_keys.get("assemblyai")
+        # Wait for the API keys; control messages such as "start" may come first
+        while True:
+            config_message = json.loads(await websocket.receive_text())
+            if config_message.get("type") == "config":
+                break
+        api_keys = config_message.get("keys", {})
+        # Browsers often capture at 44.1 or 48 kHz whatever rate was asked for; AssemblyAI gets 16 kHz mono
+        input_rate, input_channels = ingest.input_format(config_message, stt.SAMPLE_RATE)
+        resampler = (
+            audio.PolyphaseResampler(input_rate, stt.SAMPLE_RATE, input_channels)
+            if (input_rate, input_channels) != (stt.SAMPLE_RATE, 1) else None
+        )
+        await websocket.send_json({
+            "type": "ready",
+            "audio": audio_channel.negotiate(config_message),
+            "input": {"sample_rate": input_rate, "channels": input_channels},
+        })
+        # Murf websockets, if used, open while the AssemblyAI session is set up
+        asyncio.create_task(tts.warm_up(api_keys.get("murf")))
+        if config.FILLERS_ENABLED:
+            asyncio.create_task(fillers.bank.warm_up(api_keys.get("murf")))
+
+        # Audio is received and buffered while the session connects, instead of waiting on the handshake
+        if config.STT_POOL_ENABLED:
+            connect = stt_pool.pool(api_keys.get("assemblyai")).acquire(
+                on_partial_callback=on_partial_transcript,
+                on_final_callback=on_final_transcript,
+            )
+        else:
+            connect = stt.open_transcriber(
+                on_final_callback=on_final_transcript,
+                on_partial_callback=on_partial_transcript,
+                api_key=api_keys.get("assemblyai")
+            )
+        transcriber = stt.ConnectingTranscriber(connect, config.STT_PREBUFFER_SECONDS, config.STT_PREBUFFER_FLUSH_SPEED)
+
+        speech_gate = vad.SpeechGate(
+            stt.SAMPLE_RATE,
+            threshold_db=config.VAD_THRESHOLD_DB,
+            zcr_threshold=config.VAD_ZCR_THRESHOLD,
+            zcr_margin_db=config.VAD_ZCR_MARGIN_DB,
+            hangover=config.VAD_HANGOVER,
+            preroll=config.VAD_PREROLL,
+            keepalive_interval=config.VAD_KEEPALIVE_INTERVAL,
+        ) if config.VAD_ENABLED else None
+
+        def forward_frame(frame: bytes):
+            if speech_gate:
+                frame = speech_gate.process(frame)
+                if not frame:
+                    return
+            transcriber.stream_audio(frame)
+
+        frames = ingest.FrameAggregator(
+            stt.SAMPLE_RATE * config.STT_FRAME_MS // 1000 * 2,
+            forward_frame,
+            late_after=config.STT_FRAME_LATE_AFTER,
         )
 
         while True:
             data = await websocket.receive_bytes()
-            transcriber.stream_audio(data)
+            frames.push(resampler.process(data) if resampler else data)
     except Exception as e:
         logging.info(f"WebSocket connection closed: {e}")
     finally:
+        turn_gate.close()
+        if current_turn:
+            current_turn.cancel()
+        if 'frames' in locals():
+            frames.flush()
+            frames.close()
         if 'transcriber' in locals() and transcriber:
-            transcriber.close()
+            await transcriber.close_async()
         logging.info("Transcription resources released.")
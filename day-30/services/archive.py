@@ -0,0 +1,139 @@
+# services/archive.py
+import logging
+import queue
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from services import audio, metrics
+
+logger = logging.getLogger(__name__)
+
+archived_bytes = metrics.counter("archive_bytes")
+# Chunks dropped because the writer fell behind; the latency path never waits for it
+dropped_chunks = metrics.counter("archive_dropped_chunks")
+pruned_sessions = metrics.counter("archive_pruned_sessions")
+
+# Most queued items the writer handles before flushing its open files
+BATCH_SIZE = 256
+# Seconds the writer waits for more items before flushing a partial batch
+BATCH_WAIT = 0.5
+
+# Marks the end of a turn on the write queue
+_CLOSE = object()
+
+
+class _TurnFile:
+    """One turn's audio on disk: a WAV whose sizes are fixed up on close, or raw bytes."""
+
+    def __init__(self, path: Path, fmt: Optional[Tuple[int, int, int]]):
+        self.fmt = fmt
+        self.path = path.with_suffix(".wav" if fmt else ".audio")
+        self.file = open(self.path, "wb")
+        self.data_size = 0
+        if fmt:
+            self.file.write(audio.wav_header(*fmt, 0))
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self.data_size += len(data)
+
+    def close(self):
+        if self.fmt:
+            self.file.seek(4)
+            self.file.write(struct.pack("<I", 36 + self.data_size))
+            self.file.seek(40)
+            self.file.write(struct.pack("<I", self.data_size))
+        self.file.close()
+
+
+class AudioArchive:
+    """
+    Keeps a copy of the audio sent to each session, one file per turn,
+    under `directory/<session id>/`.
+
+    append() only puts the chunk on a queue, dropping it if `queue_size`
+    chunks are already waiting. Turn ends are never dropped, so no turn
+    file is left open. A background thread writes in batches, and whenever the
+    archive grows past `quota_bytes` deletes whole sessions, oldest first.
+    """
+
+    def __init__(self, directory: str, quota_bytes: int, queue_size: int = 1024):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._quota_bytes = quota_bytes
+        # Unbounded so turn ends always fit; chunks are bounded by _queued_chunks
+        self._queue = queue.SimpleQueue()
+        self._queue_size = queue_size
+        self._queued_chunks = 0
+        self._queued_lock = threading.Lock()
+        self._open: Dict[Tuple[str, int], _TurnFile] = {}
+        self._size = sum(f.stat().st_size for f in self._directory.glob("*/*") if f.is_file())
+        threading.Thread(target=self._write_loop, name="audio-archive", daemon=True).start()
+
+    def append(self, session_id: str, turn_id: int, chunk: audio.PcmChunk):
+        with self._queued_lock:
+            if self._queued_chunks >= self._queue_size:
+                dropped_chunks.inc()
+                return
+            self._queued_chunks += 1
+        self._queue.put((session_id, turn_id, chunk))
+
+    def close_turn(self, session_id: str, turn_id: int):
+        self._queue.put((session_id, turn_id, _CLOSE))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            with self._queued_lock:
+                self._queued_chunks -= sum(1 for _, _, chunk in batch if chunk is not _CLOSE)
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to archive audio: {e}")
+
+    def _write_batch(self, batch):
+        for session_id, turn_id, chunk in batch:
+            key = (session_id, turn_id)
+            if chunk is _CLOSE:
+                turn_file = self._open.pop(key, None)
+                if turn_file:
+                    turn_file.close()
+                continue
+            turn_file = self._open.get(key)
+            if turn_file is None:
+                session_dir = self._directory / session_id
+                session_dir.mkdir(exist_ok=True)
+                turn_file = self._open[key] = _TurnFile(session_dir / f"turn-{turn_id:04d}", chunk.fmt)
+            turn_file.write(chunk.data)
+            self._size += len(chunk.data)
+            archived_bytes.inc(len(chunk.data))
+        for turn_file in self._open.values():
+            turn_file.file.flush()
+        if self._size > self._quota_bytes:
+            self._enforce_quota()
+
+    def _enforce_quota(self):
+        """Deletes the oldest sessions that have no turn being written until the archive fits its quota."""
+        active = {session_id for session_id, _ in self._open}
+        sessions = sorted(
+            (path for path in self._directory.iterdir() if path.is_dir() and path.name not in active),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for session_dir in sessions:
+            if self._size <= self._quota_bytes:
+                break
+            size = sum(f.stat().st_size for f in session_dir.iterdir() if f.is_file())
+            shutil.rmtree(session_dir, ignore_errors=True)
+            self._size -= size
+            pruned_sessions.inc()
+            logger.info(f"Archive over quota, removed session {session_dir.name} ({size} bytes).")
@@ -0,0 +1,208 @@
+# services/audio.py
+import math
+import struct
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+def lowpass_kernel(cutoff: float, taps: int) -> np.ndarray:
+    """Windowed-sinc low-pass filter; `cutoff` is a fraction of the input sample rate (0..0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class PolyphaseResampler:
+    """
+    Converts 16-bit PCM to another sample rate and to mono, chunk by chunk,
+    by rational up/down resampling through a polyphase filter bank. Used
+    both for microphone audio on its way to STT and for TTS audio on its
+    way to the browser.
+
+    Only the output samples are computed: each one is the dot product of
+    the last input samples with the filter phase that lands on it, for all
+    outputs of a chunk at once. The input history and the output phase are
+    carried across chunks, so chunked and one-shot output are identical.
+    `zero_crossings` sets the filter length on each side of a sample, in
+    periods of the cutoff frequency. Chunks must hold whole sample frames.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1, zero_crossings: int = 8):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        common = math.gcd(in_rate, out_rate)
+        self._up = out_rate // common
+        self._down = in_rate // common
+        scale = max(self._up, self._down)
+        # Taps per phase: how many input samples each output sample sees
+        self._taps = 2 * zero_crossings * max(1, -(-self._down // self._up))
+        kernel = lowpass_kernel(0.45 / scale, self._taps * self._up) * self._up
+        self._bank = np.ascontiguousarray(kernel.reshape(self._taps, self._up).T[:, ::-1])
+        self._window = np.arange(self._taps)
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+        # Position of the next output on the upsampled time axis, relative to the next chunk
+        self._position = 0
+
+    def process(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self._up == self._down:
+            return np.rint(samples).astype("<i2").tobytes()
+        return self._resample(samples)
+
+    def flush(self) -> bytes:
+        """Pushes out the samples still held back by the filter delay at the end of a stream."""
+        if self._up == self._down:
+            return b""
+        return self._resample(np.zeros(self._taps // 2, dtype=np.float32))
+
+    def _resample(self, samples: np.ndarray) -> bytes:
+        buffered = np.concatenate((self._history, samples))
+        self._history = buffered[len(buffered) - len(self._history):]
+
+        span = len(samples) * self._up
+        count = -(-(span - self._position) // self._down) if span > self._position else 0
+        positions = self._position + self._down * np.arange(count)
+        self._position += self._down * count - span
+
+        # Row i holds the input window ending at output i's sample, oldest first
+        windows = buffered[(positions // self._up)[:, None] + self._window]
+        out = np.einsum("ij,ij->i", windows, self._bank[positions % self._up])
+        return np.clip(np.rint(out), -32768, 32767).astype("<i2").tobytes()
+
+
+class PcmChunk(NamedTuple):
+    """
+    A piece of a synthesized audio stream.
+
+    `fmt` is (channels, sample rate, bits per sample) for PCM, parsed once
+    per stream and shared by all of its chunks, and None for audio that is
+    not PCM, whose `data` is passed along as it arrived. `data` may be a
+    memoryview into the bytes received from the provider.
+    """
+
+    data: Union[bytes, memoryview]
+    fmt: Optional[Tuple[int, int, int]]
+
+
+def duration(chunk: PcmChunk) -> float:
+    """Seconds of audio in a chunk; 0 for audio that is not PCM."""
+    if chunk.fmt is None:
+        return 0.0
+    channels, sample_rate, bits = chunk.fmt
+    return len(chunk.data) / (channels * sample_rate * bits // 8)
+
+
+class WavSegmenter:
+    """
+    Splits a streamed WAV file into chunks of bare PCM.
+
+    Only the first bytes of a Murf stream carry the RIFF header. It is
+    parsed once, and the PCM after it is handed on with that format, cut
+    at sample boundaries. In the steady state a chunk is sliced through a
+    memoryview and not copied at all. Streams that are not WAV are passed
+    through unchanged, with no format.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._header = None  # (channels, sample_rate, bits per sample), once parsed
+        self._block_align = 1
+        self._passthrough = False
+
+    def feed(self, chunk: bytes) -> List[PcmChunk]:
+        if self._passthrough:
+            return [PcmChunk(chunk, None)]
+        if self._header is not None and not self._buffer and chunk[:4] == b"RIFF" and chunk[8:12] == b"WAVE":
+            # Some streams repeat the header on every chunk
+            self._header = None
+        if self._header is not None and not self._buffer:
+            # Steady state: cut the chunk in place, holding back only a partial sample frame
+            view = memoryview(chunk)
+            usable = len(view) - len(view) % self._block_align
+            self._buffer += view[usable:]
+            return [PcmChunk(view[:usable], self._header)] if usable else []
+        self._buffer += chunk
+        if self._header is None and not self._parse_header():
+            return []
+        return self._segments(flush=False)
+
+    def finish(self) -> List[PcmChunk]:
+        if self._header is None:
+            # Never found a data chunk: hand over whatever arrived
+            data, self._buffer = bytes(self._buffer), bytearray()
+            return [PcmChunk(data, None)] if data else []
+        return self._segments(flush=True)
+
+    def _parse_header(self) -> bool:
+        if len(self._buffer) >= 4 and self._buffer[:4] != b"RIFF":
+            self._passthrough = True
+            return True
+        offset = 12
+        fmt = None
+        while offset + 8 <= len(self._buffer):
+            chunk_id = bytes(self._buffer[offset:offset + 4])
+            size = struct.unpack_from("<I", self._buffer, offset + 4)[0]
+            if chunk_id == b"data":
+                if fmt is None:
+                    self._passthrough = True
+                    return True
+                self._header = fmt
+                self._block_align = max(1, fmt[0] * fmt[2] // 8)
+                del self._buffer[:offset + 8]
+                return True
+            if offset + 8 + size > len(self._buffer):
+                return False
+            if chunk_id == b"fmt ":
+                _, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", self._buffer, offset + 8)
+                fmt = (channels, sample_rate, bits)
+            offset += 8 + size + (size & 1)
+        return False
+
+    def _segments(self, flush: bool) -> List[PcmChunk]:
+        if self._passthrough:
+            data, self._buffer = bytes(self._buffer), bytearray()
+            return [PcmChunk(data, None)] if data else []
+        usable = len(self._buffer) if flush else len(self._buffer) - len(self._buffer) % self._block_align
+        if usable <= 0:
+            return []
+        pcm = bytes(self._buffer[:usable])
+        del self._buffer[:usable]
+        return [PcmChunk(pcm, self._header)]
+
+
+def wav_header(channels: int, sample_rate: int, bits: int, data_size: int) -> bytes:
+    """Canonical 44-byte PCM WAV header."""
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", data_size,
+    )
+
+
+def to_wav(chunk: PcmChunk) -> bytes:
+    """A playable WAV file holding the chunk; audio that is not PCM is returned as it is."""
+    if chunk.fmt is None:
+        return bytes(chunk.data)
+    return b"".join((wav_header(*chunk.fmt, len(chunk.data)), chunk.data))
+
+
+def from_wav(data: bytes) -> PcmChunk:
+    """Reads back what to_wav wrote; the PCM is a view into `data`."""
+    if data[:4] != b"RIFF" or data[36:40] != b"data":
+        return PcmChunk(data, None)
+    channels, sample_rate = struct.unpack_from("<HI", data, 22)
+    bits = struct.unpack_from("<H", data, 34)[0]
+    return PcmChunk(memoryview(data)[44:], (channels, sample_rate, bits))
+
+
+def join_chunks(chunks: List[PcmChunk]) -> PcmChunk:
+    """Merges a stream's chunks into one."""
+    if len(chunks) == 1:
+        return chunks[0]
+    fmt = chunks[0].fmt if all(chunk.fmt == chunks[0].fmt for chunk in chunks) else None
+    return PcmChunk(b"".join(chunk.data for chunk in chunks), fmt)
@@ -0,0 +1,146 @@
+# services/clients.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+import httpx
+import requests
+from murf import Murf
+from requests.adapters import HTTPAdapter
+from serpapi import GoogleSearch
+
+import config
+from services import metrics
+
+
+def _key_hash(api_key: Optional[str]) -> str:
+    # Raw keys never become dict keys or show up in a heap dump of the registry index
+    return hashlib.sha256((api_key or "").encode()).hexdigest()
+
+
+class ClientRegistry:
+    """
+    Process-wide cache of provider clients, one per API key.
+
+    Clients are keyed by a hash of the key, evicted least-recently-used
+    beyond `max_size`, and closed once idle for `idle_ttl` seconds so their
+    keep-alive connections are not held forever. Safe to use from worker threads.
+    """
+
+    def __init__(self, name: str, factory: Callable[[str], Any], close: Callable[[Any], None], max_size: int, idle_ttl: float):
+        self._factory = factory
+        self._close = close
+        self._max_size = max_size
+        self._idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        # key hash -> [client, last used (monotonic)], least recently used first
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self.hits = metrics.counter(f"clients_{name}_hits")
+        self.misses = metrics.counter(f"clients_{name}_misses")
+        self.evictions = metrics.counter(f"clients_{name}_evictions")
+        self.size = metrics.gauge(f"clients_{name}_size")
+
+    def get(self, api_key: str):
+        key = _key_hash(api_key)
+        now = time.monotonic()
+        with self._lock:
+            expired = self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = now
+                self._entries.move_to_end(key)
+        self._close_all(expired)
+        if entry is not None:
+            self.hits.inc()
+            return entry[0]
+
+        # Built outside the lock; if two threads race, the loser's client is closed
+        self.misses.inc()
+        client = self._factory(api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [client, now]
+                evicted = []
+                while len(self._entries) > self._max_size:
+                    evicted.append(self._entries.popitem(last=False)[1][0])
+                self.size.set(len(self._entries))
+            else:
+                evicted = [client]
+                client = entry[0]
+        self._close_all(evicted)
+        return client
+
+    def _expire(self, now: float):
+        expired = []
+        while self._entries:
+            key, (client, last_used) = next(iter(self._entries.items()))
+            if now - last_used < self._idle_ttl:
+                break
+            del self._entries[key]
+            expired.append(client)
+        self.size.set(len(self._entries))
+        return expired
+
+    def _close_all(self, clients):
+        for client in clients:
+            self.evictions.inc()
+            try:
+                self._close(client)
+            except Exception:
+                pass
+
+
+def _new_murf(api_key: str) -> Tuple[Murf, httpx.Client]:
+    """A Murf client and the connection pool it sends through, which the registry closes."""
+    http_client = httpx.Client(
+        timeout=60,
+        limits=httpx.Limits(
+            max_connections=config.CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=config.CLIENT_MAX_CONNECTIONS,
+            keepalive_expiry=config.CLIENT_IDLE_TTL,
+        ),
+    )
+    return Murf(api_key=api_key, httpx_client=http_client), http_client
+
+
+def _new_session(api_key: str) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.CLIENT_MAX_CONNECTIONS)
+    session.mount("https://", adapter)
+    return session
+
+
+murf_clients = ClientRegistry(
+    "murf", _new_murf, lambda entry: entry[1].close(),
+    config.CLIENT_REGISTRY_SIZE, config.CLIENT_IDLE_TTL,
+)
+serpapi_sessions = ClientRegistry(
+    "serpapi", _new_session, lambda session: session.close(),
+    config.CLIENT_REGISTRY_SIZE, config.CLIENT_IDLE_TTL,
+)
+
+
+def murf(api_key: str) -> Murf:
+    """Returns the shared Murf client for this key."""
+    client, _ = murf_clients.get(api_key)
+    return client
+
+
+class PooledGoogleSearch(GoogleSearch):
+    """GoogleSearch that sends its request over a shared keep-alive session."""
+
+    def __init__(self, params_dict, session: requests.Session, **kwargs):
+        super().__init__(params_dict, **kwargs)
+        self.session = session
+
+    def get_response(self, path='/search'):
+        url, parameter = self.construct_url(path)
+        return self.session.get(url, params=parameter, timeout=30)
+
+
+def google_search(params: dict) -> GoogleSearch:
+    """Builds a search that reuses the pooled connection for params["api_key"]."""
+    return PooledGoogleSearch(params, serpapi_sessions.get(params.get("api_key")))
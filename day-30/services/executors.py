@@ -0,0 +1,147 @@
+# services/executors.py
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import config
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Teardown calls run here, outside every pool's admission control
+_cleanup_executor = ThreadPoolExecutor(thread_name_prefix="cleanup")
+
+
+class PoolSaturated(Exception):
+    """Raised when a provider pool cannot take more work under its policy."""
+
+
+class _QueueTicket:
+    """Removes one submission from the queued gauge exactly once."""
+
+    __slots__ = ("_gauge", "_lock", "_left")
+
+    def __init__(self, gauge: metrics.Gauge):
+        self._gauge = gauge
+        self._lock = threading.Lock()
+        self._left = False
+        gauge.inc()
+
+    def leave(self):
+        with self._lock:
+            if self._left:
+                return
+            self._left = True
+        self._gauge.dec()
+
+
+class ProviderPool:
+    """
+    A sized pool for one upstream provider.
+
+    At most `max_workers` calls run at once and `max_queue` more may wait
+    for a worker. Beyond that the pool is saturated and its policy applies:
+      - "wait":    wait up to `deadline` seconds for room, then PoolSaturated
+      - "shed":    raise PoolSaturated immediately
+      - "degrade": return None immediately, the caller's "no result" path
+    Blocking SDK calls go through run(); native async calls through limit().
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, policy: str = "wait", deadline: float = 5.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._admission = None
+        self.active = metrics.gauge(f"pool_{name}_active")
+        self.queued = metrics.gauge(f"pool_{name}_queued")
+        self.rejected = metrics.counter(f"pool_{name}_rejected")
+        self.degraded = metrics.counter(f"pool_{name}_degraded")
+
+    async def _admit(self) -> bool:
+        """Takes a slot in the pool. Returns False when the call should degrade."""
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_workers + self.max_queue)
+        if not self._admission.locked():
+            await self._admission.acquire()
+            return True
+
+        if self.policy == "wait":
+            try:
+                await asyncio.wait_for(self._admission.acquire(), self.deadline)
+                return True
+            except asyncio.TimeoutError:
+                pass
+        elif self.policy == "degrade":
+            self.degraded.inc()
+            return False
+
+        self.rejected.inc()
+        logger.warning(f"{self.name} pool saturated, rejecting call")
+        raise PoolSaturated(f"{self.name} pool is saturated")
+
+    def _call(self, fn, ticket: "_QueueTicket"):
+        ticket.leave()
+        self.active.inc()
+        try:
+            return fn()
+        finally:
+            self.active.dec()
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs a blocking call in the pool and awaits its result."""
+        if not await self._admit():
+            return None
+        ticket = _QueueTicket(self.queued)
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            return await loop.run_in_executor(self._executor, self._call, call, ticket)
+        finally:
+            # A call cancelled before reaching a worker never leaves the queue by itself
+            ticket.leave()
+            self._admission.release()
+
+    @asynccontextmanager
+    async def limit(self):
+        """Holds a slot around a native async call. A degraded call is rejected, having no result to fall back to."""
+        if not await self._admit():
+            raise PoolSaturated(f"{self.name} pool is saturated")
+        self.active.inc()
+        try:
+            yield
+        finally:
+            self.active.dec()
+            self._admission.release()
+
+
+_pools = {name: ProviderPool(name, **settings) for name, settings in config.PROVIDER_POOLS.items()}
+
+
+def pool(name: str) -> ProviderPool:
+    return _pools[name]
+
+
+async def run(name: str, fn, *args, **kwargs):
+    """Runs a blocking call in the named provider pool and awaits its result."""
+    return await _pools[name].run(fn, *args, **kwargs)
+
+
+def limit(name: str):
+    """Async context manager holding a slot of the named provider pool."""
+    return _pools[name].limit()
+
+
+async def cleanup(fn, *args, **kwargs):
+    """
+    Runs a blocking teardown call, such as a disconnect, off the event loop.
+    It takes no pool slot and is never shed, degraded or timed out, so a
+    saturated pool cannot leave a provider session open.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_cleanup_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,116 @@
+# services/fillers.py
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from services import audio, metrics, tracing, tts
+
+logger = logging.getLogger(__name__)
+
+# Short acknowledgements played while a web search keeps the real answer waiting
+SEARCH_PHRASES = (
+    "Let me look that up.",
+    "One moment.",
+    "Let me check on that.",
+    "Give me a second.",
+)
+
+fillers_played = metrics.counter("fillers_played")
+# Turns whose budget ran out before any filler audio was synthesized
+fillers_unavailable = metrics.counter("fillers_unavailable")
+
+
+class FillerBank:
+    """
+    Pre-synthesized filler audio per voice.
+
+    Phrases are synthesized once per voice through the TTS cache, so after
+    the first run they are loaded from disk rather than from Murf. Lookups
+    only ever return audio that is already in memory.
+    """
+
+    def __init__(self, phrases=SEARCH_PHRASES):
+        self._phrases = phrases
+        self._audio: Dict[str, Dict[str, audio.PcmChunk]] = {}
+        self._warming: Dict[str, asyncio.Task] = {}
+
+    async def warm_up(self, api_key: str, voice_id: str = tts.VOICE_ID):
+        """Synthesizes the phrases for `voice_id` unless that is done or under way."""
+        if not api_key or voice_id in self._audio:
+            return
+        task = self._warming.get(voice_id)
+        if task is None:
+            task = asyncio.create_task(self._synthesize_all(api_key, voice_id))
+            self._warming[voice_id] = task
+        await asyncio.shield(task)
+
+    async def _synthesize_all(self, api_key: str, voice_id: str):
+        ready = {}
+        try:
+            for phrase in self._phrases:
+                try:
+                    chunks = [chunk async for chunk in tts.stream_speech(phrase, api_key, persist=True)]
+                except Exception as e:
+                    logger.warning(f"Could not synthesize filler '{phrase}': {e}")
+                    continue
+                if chunks:
+                    ready[phrase] = audio.join_chunks(chunks)
+        finally:
+            del self._warming[voice_id]
+        if ready:
+            self._audio[voice_id] = ready
+            logger.info(f"Filler bank ready for {voice_id}: {len(ready)} phrases.")
+
+    def pick(self, voice_id: str = tts.VOICE_ID) -> Optional[tuple]:
+        """A random ready (phrase, audio) pair, or None. Never synthesizes."""
+        audio = self._audio.get(voice_id)
+        if not audio:
+            return None
+        phrase = random.choice(list(audio))
+        return phrase, audio[phrase]
+
+
+bank = FillerBank()
+
+
+class FillerPolicy:
+    """
+    Decides, for one turn, whether to play a filler.
+
+    Once armed, a filler is played if no real audio has been sent by the
+    time `budget` seconds have passed since the user finished speaking. At
+    most one filler is played per turn.
+    """
+
+    def __init__(self, play: Callable[[str, audio.PcmChunk], Awaitable[None]], turn_started_ns: int, budget: float):
+        self._play = play
+        self._deadline_ns = turn_started_ns + int(budget * 1e9)
+        self._timer = None
+        self._audio_started = False
+
+    def arm(self):
+        if self._timer is None and not self._audio_started:
+            self._timer = asyncio.create_task(self._wait_and_play())
+
+    def audio_started(self):
+        self._audio_started = True
+        self.cancel()
+
+    def cancel(self):
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+
+    async def _wait_and_play(self):
+        await asyncio.sleep(max(0.0, (self._deadline_ns - time.perf_counter_ns()) / 1e9))
+        if self._audio_started:
+            return
+        choice = bank.pick()
+        if choice is None:
+            fillers_unavailable.inc()
+            return
+        phrase, audio = choice
+        fillers_played.inc()
+        tracing.event("filler", phrase=phrase)
+        await self._play(phrase, audio)
@@ -0,0 +1,88 @@
+# services/framing.py
+import base64
+import struct
+
+from fastapi import WebSocket
+
+from services import audio
+
+# Binary audio frame header: turn id, sequence number within the turn, codec, flags
+HEADER = struct.Struct("!IIBB")
+
+CODEC_WAV = 1
+CODEC_PCM16 = 2
+
+FLAG_FINAL = 0x01
+
+TRANSPORT_JSON = "json"
+TRANSPORT_BINARY = "binary"
+
+
+def pack(turn_id: int, seq: int, codec: int, flags: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(turn_id, seq, codec, flags) + payload
+
+
+class AudioChannel:
+    """
+    Sends a session's audio in the transport negotiated with the client.
+
+    "binary" sends each chunk as a binary websocket frame prefixed with
+    HEADER, and ends a turn with an empty frame flagged FLAG_FINAL.
+    "json" is the original {"type": "audio", "b64": ...} message.
+    Control messages are JSON either way.
+
+    Audio arrives as bare PCM with its format. JSON messages and "wav"
+    binary frames wrap each chunk in a WAV header of its own, so the
+    browser can decode it alone. With the "pcm16" codec, binary frames
+    carry the PCM as it is, so a turn is one continuous PCM stream; its
+    format is announced once per turn in an "audio_format" message.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self.transport = TRANSPORT_JSON
+        self.codec = CODEC_WAV
+        self._turn_id = None
+        self._seq = 0
+        self._announced = None
+
+    def negotiate(self, config_message: dict) -> dict:
+        """Applies what the client asked for in its config message; clients that predate it get JSON and WAV."""
+        requested = config_message.get("audio") or {}
+        if requested.get("transport") == TRANSPORT_BINARY:
+            self.transport = TRANSPORT_BINARY
+            if requested.get("codec") == "pcm16":
+                self.codec = CODEC_PCM16
+        return {"transport": self.transport, "codec": "pcm16" if self.codec == CODEC_PCM16 else "wav"}
+
+    async def send(self, turn_id: int, chunk: audio.PcmChunk):
+        if self.transport == TRANSPORT_JSON:
+            wav = audio.to_wav(chunk)
+            await self._websocket.send_json({"type": "audio", "b64": base64.b64encode(wav).decode('utf-8')})
+            return
+        fmt = chunk.fmt
+        if self.codec != CODEC_PCM16 or fmt is None or fmt[2] != 16:
+            header = HEADER.pack(turn_id, self._next_seq(turn_id), CODEC_WAV, 0)
+            wav_header = audio.wav_header(*fmt, len(chunk.data)) if fmt else b""
+            await self._websocket.send_bytes(b"".join((header, wav_header, chunk.data)))
+            return
+        if self._announced != (turn_id, fmt):
+            channels, sample_rate, _ = fmt
+            await self._websocket.send_json(
+                {"type": "audio_format", "turn_id": turn_id, "codec": "pcm16", "sample_rate": sample_rate, "channels": channels}
+            )
+            self._announced = (turn_id, fmt)
+        header = HEADER.pack(turn_id, self._next_seq(turn_id), CODEC_PCM16, 0)
+        await self._websocket.send_bytes(b"".join((header, chunk.data)))
+
+    async def end_turn(self, turn_id: int):
+        if self.transport == TRANSPORT_BINARY:
+            await self._websocket.send_bytes(pack(turn_id, self._next_seq(turn_id), self.codec, FLAG_FINAL))
+
+    def _next_seq(self, turn_id: int) -> int:
+        if turn_id != self._turn_id:
+            self._turn_id = turn_id
+            self._seq = 0
+        seq = self._seq
+        self._seq += 1
+        return seq
@@ -0,0 +1,102 @@
+# services/ingest.py
+import time
+from typing import Callable, Tuple
+
+from services import metrics
+
+# Microphone formats accepted from clients
+MIN_INPUT_RATE = 8000
+MAX_INPUT_RATE = 192000
+MAX_INPUT_CHANNELS = 2
+
+# Frames held by the ring; a push larger than the free space is taken in several passes
+RING_FRAMES = 8
+
+frames_emitted = metrics.counter("ingest_frames")
+# Frames padded with silence because the stream ended mid-frame
+partial_frames = metrics.counter("ingest_partial_frames")
+# Frames whose first byte waited longer than `late_after` for the rest to arrive
+late_frames = metrics.counter("ingest_late_frames")
+buffered_bytes = metrics.gauge("ingest_buffered_bytes")
+
+
+def input_format(config_message: dict, default_rate: int) -> Tuple[int, int]:
+    """
+    (sample rate, channels) of the microphone audio the client will send, as
+    declared in its config message. Clients that predate it, or declare
+    something unusable, are assumed to send `default_rate` mono.
+    """
+    declared = config_message.get("input") or {}
+    try:
+        rate = int(declared.get("sample_rate", default_rate))
+        channels = int(declared.get("channels", 1))
+    except (TypeError, ValueError):
+        return default_rate, 1
+    if not MIN_INPUT_RATE <= rate <= MAX_INPUT_RATE or not 1 <= channels <= MAX_INPUT_CHANNELS:
+        return default_rate, 1
+    return rate, channels
+
+
+class FrameAggregator:
+    """
+    Re-frames inbound PCM, which arrives in whatever sizes the browser
+    produces, into fixed frames of `frame_bytes` for the STT client.
+
+    Bytes are copied into a ring allocated once. Frames start at multiples
+    of `frame_bytes` and the ring holds a whole number of them, so a frame
+    never wraps and is handed to `emit` as a single copy; the copy is
+    required since the STT SDK queues the frame for its writer thread.
+    """
+
+    def __init__(self, frame_bytes: int, emit: Callable[[bytes], None], late_after: float):
+        self._frame_bytes = frame_bytes
+        self._emit = emit
+        self._late_after_ns = int(late_after * 1e9)
+        self._ring = bytearray(frame_bytes * RING_FRAMES)
+        self._view = memoryview(self._ring)
+        self._read = 0
+        self._size = 0
+        self._frame_started = 0
+
+    def push(self, data: bytes):
+        data = memoryview(data)
+        now = time.perf_counter_ns()
+        if not self._size:
+            self._frame_started = now
+        capacity = len(self._ring)
+        while data:
+            write = (self._read + self._size) % capacity
+            n = min(len(data), capacity - self._size, capacity - write)
+            self._view[write:write + n] = data[:n]
+            data = data[n:]
+            self._size += n
+            buffered_bytes.inc(n)
+            while self._size >= self._frame_bytes:
+                self._emit_frame(now)
+
+    def flush(self):
+        """Emits what is buffered as a final frame, padded with silence to full length."""
+        if not self._size:
+            return
+        padding = self._frame_bytes - self._size
+        self._view[self._read + self._size:self._read + self._frame_bytes] = bytes(padding)
+        self._size += padding
+        buffered_bytes.inc(padding)
+        partial_frames.inc()
+        self._emit_frame(time.perf_counter_ns())
+
+    def close(self):
+        buffered_bytes.dec(self._size)
+        self._size = 0
+
+    def _emit_frame(self, now: int):
+        frame = bytes(self._view[self._read:self._read + self._frame_bytes])
+        self._read = (self._read + self._frame_bytes) % len(self._ring)
+        self._size -= self._frame_bytes
+        buffered_bytes.dec(self._frame_bytes)
+        frames_emitted.inc()
+        if now - self._frame_started > self._late_after_ns:
+            late_frames.inc()
+        # Whatever is left of this push arrived now
+        self._frame_started = now
+        self._emit(frame)
@@ -1,7 +1,9 @@
 # services/llm.py
 import google.generativeai as genai
-from typing import List, Dict, Any, Tuple
-from serpapi import GoogleSearch
+from typing import List, Dict, Any, Tuple, AsyncIterator, Optional
+import re
+
+from services import clients, executors, tracing
 
 # Configure logging
 import logging
@@ -21,6 +23,23 @@ Rules:
 Goal: Be a fast, reliable, and efficient assistant for everyday tasks, coding help, research, and productivity, always maintaining a helpful and slightly humorous demeanor.
 """
 
+ERROR_RESPONSE = "I'm sorry, I encountered an error while processing your request."
+NO_RESULTS_RESPONSE = "I couldn't find any relevant information on the web."
+
+
+class ReplyFailed(Exception):
+    """The LLM call failed; whatever it streamed before is not a complete reply."""
+
+
+# A sentence ends at . ? or ! followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.?!])\s+')
+
+# _KEY_BINDING: genai.configure() is process-wide, and a model binds the configured key
+# lazily, synchronously at the start of its first call. Async callers therefore take
+# their pool slot first (waiting for it may suspend) and then configure, build and call
+# the model without awaiting in between, so no other session can reconfigure the key
+# before this request has bound it.
+
 def should_search_web(user_query: str, api_key: str) -> bool:
     """
     Uses a lightweight LLM prompt to decide if a web search is necessary.
@@ -35,6 +54,20 @@ def should_search_web(user_query: str, api_key: str) -> bool:
         logger.error(f"Error in should_search_web: {e}")
         return False
 
+async def should_search_web_async(user_query: str, api_key: str) -> bool:
+    """Async variant of should_search_web that does not block the event loop."""
+    try:
+        prompt = f"Does the following query require a web search to answer accurately? Respond with only 'yes' or 'no'.\n\nQuery: '{user_query}'"
+        async with executors.limit("llm"):
+            # See _KEY_BINDING: no await between configure and the call
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel('gemini-1.5-flash')
+            response = await model.generate_content_async(prompt)
+        return response.text.strip().lower() == "yes"
+    except Exception as e:
+        logger.error(f"Error in should_search_web_async: {e}")
+        return False
+
 def get_llm_response(user_query: str, history: List[Dict[str, Any]], api_key: str) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM and updates chat history."""
     try:
@@ -45,25 +78,88 @@ def get_llm_response(user_query: str, history: List[Dict[str, Any]], api_key: st
         return response.text, chat.history
     except Exception as e:
         logger.error(f"Error getting LLM response: {e}")
-        return "I'm sorry, I encountered an error while processing your request.", history
+        return ERROR_RESPONSE, history
+
+async def stream_llm_response(user_query: str, history: List[Dict[str, Any]], api_key: str) -> AsyncIterator[str]:
+    """
+    Streams the Gemini reply as text chunks while it is being generated.
+    The history is not modified; use extend_history once the reply is known.
+    Raises ReplyFailed if the call fails, before or after the first chunk.
+    """
+    produced = False
+    span = tracing.start_span("llm", prompt_chars=len(user_query))
+    try:
+        async with executors.limit("llm"):
+            # See _KEY_BINDING: no await between configure and the call
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
+            chat = model.start_chat(history=history)
+            response = await chat.send_message_async(user_query, stream=True)
+            async for chunk in response:
+                # Chunks without parts (e.g. the final finish_reason chunk) have no text
+                if chunk.parts and chunk.text:
+                    if not produced:
+                        span.event("first_token")
+                    produced = True
+                    yield chunk.text
+    except Exception as e:
+        logger.error(f"Error streaming LLM response: {e}")
+        span.set(error=type(e).__name__)
+        raise ReplyFailed(str(e)) from e
+    finally:
+        span.finish()
+
+async def stream_sentences(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regroups a stream of text chunks into complete sentences."""
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        sentences = SENTENCE_BOUNDARY.split(buffer)
+        # The last piece may still be growing
+        buffer = sentences.pop()
+        for sentence in sentences:
+            if sentence.strip():
+                yield sentence.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+def extend_history(history: List[Dict[str, Any]], user_query: str, response_text: str) -> List[Dict[str, Any]]:
+    """Returns a copy of the history with one more user/model exchange."""
+    return list(history) + [
+        {"role": "user", "parts": [user_query]},
+        {"role": "model", "parts": [response_text]},
+    ]
+
+def build_web_prompt(user_query: str, serp_api_key: str) -> Optional[str]:
+    """
+    Searches the web and returns an LLM prompt grounded on the top results,
+    or None when the search came back empty.
+    """
+    params = {
+        "q": user_query,
+        "api_key": serp_api_key,
+        "engine": "google",
+    }
+    search = clients.google_search(params)
+    results = search.get_dict()
+    if "organic_results" not in results:
+        return None
+    search_context = "\n".join([result.get("snippet", "") for result in results["organic_results"][:5]])
+    return f"Based on the following search results, answer the user's query: '{user_query}'\n\nSearch Results:\n{search_context}"
 
 def get_web_response(user_query: str, history: List[Dict[str, Any]], gemini_api_key: str, serp_api_key: str) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM after performing a web search."""
     try:
-        params = {
-            "q": user_query,
-            "api_key": serp_api_key,
-            "engine": "google",
-        }
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        if "organic_results" in results:
-            search_context = "\n".join([result.get("snippet", "") for result in results["organic_results"][:5]])
-            prompt_with_context = f"Based on the following search results, answer the user's query: '{user_query}'\n\nSearch Results:\n{search_context}"
+        prompt_with_context = build_web_prompt(user_query, serp_api_key)
+        if prompt_with_context:
             return get_llm_response(prompt_with_context, history, gemini_api_key)
         else:
-            return "I couldn't find any relevant information on the web.", history
+            return NO_RESULTS_RESPONSE, history
 
     except Exception as e:
         logger.error(f"Error getting LLM response: {e}")
-        return "I'm sorry, I encountered an error while processing your request.", history
\ No newline at end of file
+        return ERROR_RESPONSE, history
+
+async def build_web_prompt_async(user_query: str, serp_api_key: str) -> Optional[str]:
+    """Runs the blocking SerpAPI search in the search pool."""
+    return await executors.run("search", build_web_prompt, user_query, serp_api_key)
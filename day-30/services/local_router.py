@@ -0,0 +1,88 @@
+# services/local_router.py
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from services import metrics
+
+# Normalized queries whose decision is remembered
+CACHE_SIZE = 4096
+
+cache_hits = metrics.counter("router_cache_hits")
+cache_misses = metrics.counter("router_cache_misses")
+llm_fallbacks = metrics.counter("router_llm_fallbacks")
+
+# (pattern, weight) pairs; a positive weight pushes towards a web search
+_FEATURES = [
+    # Temporal cues: the answer depends on when the question is asked
+    (re.compile(r"\b(today|tonight|tomorrow|yesterday|now|currently|current|latest|recent|recently|"
+                r"upcoming|these days|so far|live|this (week|weekend|month|year|quarter|morning|evening)|"
+                r"next (match|game|week|month|year|election))\b"), 2.0),
+    (re.compile(r"\b(19|20)\d\d\b"), 1.0),
+    # Topics that are inherently live
+    (re.compile(r"\b(weather|forecast|temperature|rain|snow|sunny|storms?|hurricane|humidity|air quality|sunset|sunrise)\b"), 2.5),
+    (re.compile(r"\b(what s new|news|headlines?|stories|updates?|announce[ds]?|happening|trending|status)\b"), 2.0),
+    (re.compile(r"\b(score|won|win|winner|standings|leading|polls?|results?|final|match|playing|schedule)\b"), 1.5),
+    (re.compile(r"\b(price|prices|cost|costs|stock|stocks|trading|markets?|exchange rate|inflation|interest rate|"
+                r"bitcoin|crypto|earnings)\b"), 2.0),
+    (re.compile(r"\b(open|close|delayed|traffic|near me|nearest|flight|release date|come out|released?|launch(ed)?)\b"), 1.5),
+    (re.compile(r"\b(ceo|president|prime minister|population|reviews?)\b"), 1.5),
+    # Question types that are usually answered from the model's own knowledge
+    (re.compile(r"\b(how (do|can|does|to)|explain|define|definition|what does .* mean|difference between|why)\b"), -2.0),
+    (re.compile(r"\b(write|compose|poem|haiku|limerick|story|joke|quote|fun fact|rhymes?)\b"), -2.5),
+    (re.compile(r"\b(code|python|javascript|css|function|loop|git|list|tuple|recursion|programming)\b"), -2.0),
+    (re.compile(r"\b(translate|convert|calculate|percent|square root|times|plus|minus|count)\b|\d+\s*[-+*/x]\s*\d+"), -2.0),
+    (re.compile(r"^(hello|hi|hey|thanks|thank you)\b|\b(you|your|yourself)\b"), -1.5),
+    (re.compile(r"\b(history|invented|what year did|theory|formula|work|works)\b"), -1.5),
+]
+_BIAS = -1.0
+_NORMALIZE = re.compile(r"[^a-z0-9 ]+")
+
+
+class Decision(NamedTuple):
+    search: bool
+    # 0 when the features are evenly balanced, approaching 1 when they agree strongly
+    confidence: float
+
+
+_cache: "OrderedDict[str, Decision]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def normalize(user_query: str) -> str:
+    """Lower-cases the query and strips punctuation so trivial variants share a cache entry."""
+    return " ".join(_NORMALIZE.sub(" ", user_query.lower()).split())
+
+
+def _score(normalized: str) -> Decision:
+    # Only the normalized text is read, so every query sharing a cache entry scores the same
+    score = _BIAS
+    for pattern, weight in _FEATURES:
+        if pattern.search(normalized):
+            score += weight
+    probability = 1 / (1 + math.exp(-score))
+    # An even score is no evidence for a search; with confidence 0 it goes to the fallback
+    return Decision(probability > 0.5, abs(2 * probability - 1))
+
+
+def classify(user_query: str) -> Decision:
+    """Decides from lexical features alone whether a query needs fresh web results."""
+    key = normalize(user_query)
+    with _cache_lock:
+        decision = _cache.get(key)
+        if decision is not None:
+            _cache.move_to_end(key)
+    if decision is not None:
+        cache_hits.inc()
+        return decision
+
+    cache_misses.inc()
+    decision = _score(key)
+    with _cache_lock:
+        _cache[key] = decision
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return decision
+
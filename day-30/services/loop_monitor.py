@@ -0,0 +1,85 @@
+# services/loop_monitor.py
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+lag_ms = metrics.histogram("event_loop_lag_ms")
+stalls = metrics.counter("event_loop_stalls")
+
+# Stack samples logged per stall, so a long freeze does not flood the log
+MAX_SAMPLES_PER_STALL = 3
+# Innermost frames included in each sample
+STACK_DEPTH = 12
+
+
+class LoopMonitor:
+    """
+    Watches the event loop it is started on.
+
+    A heartbeat task wakes up every `interval` seconds and records how late
+    it woke up as loop lag. A watchdog thread notices when the heartbeat has
+    stopped for longer than `stall_threshold` and logs a stack sample of the
+    loop thread, i.e. of the callback or coroutine that is hogging it.
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.25):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._heartbeat_task = None
+        self._stopped = threading.Event()
+
+    async def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        logger.info(f"Event loop monitor started (stall threshold {self.stall_threshold * 1000:.0f} ms).")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms.observe(max(0.0, loop.time() - expected) * 1000)
+            self._last_beat = time.monotonic()
+
+    def _watchdog(self):
+        samples = 0
+        while not self._stopped.wait(self.stall_threshold / 2):
+            stalled_for = time.monotonic() - self._last_beat - self.interval
+            if stalled_for < self.stall_threshold:
+                samples = 0
+                continue
+            if samples == 0:
+                stalls.inc()
+            if samples < MAX_SAMPLES_PER_STALL:
+                samples += 1
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH)) if frame else "<no frame>"
+                logger.warning(
+                    f"Event loop stalled for {stalled_for * 1000:.0f} ms "
+                    f"(sample {samples}/{MAX_SAMPLES_PER_STALL}), loop thread is at:\n{stack}"
+                )
+
+
+def install(app, interval: float, stall_threshold: float) -> LoopMonitor:
+    """Runs a LoopMonitor for the lifetime of the app, without touching any handler."""
+    monitor = LoopMonitor(interval, stall_threshold)
+    app.router.add_event_handler("startup", monitor.start)
+    app.router.add_event_handler("shutdown", monitor.stop)
+    return monitor
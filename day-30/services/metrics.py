@@ -0,0 +1,108 @@
+# services/metrics.py
+import threading
+from collections import deque
+from typing import Dict, Any
+
+# Observations kept per histogram for percentile estimates
+HISTOGRAM_WINDOW = 1024
+
+_lock = threading.Lock()
+_metrics: Dict[str, Any] = {}
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Value that can go up and down, e.g. a queue depth."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Keeps a sliding window of observations and reports percentiles over it."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._window = deque(maxlen=HISTOGRAM_WINDOW)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._window.append(value)
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._window)
+        if not values:
+            return {"count": self.count}
+
+        def pick(p):
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3),
+            "p50": pick(50),
+            "p90": pick(90),
+            "p99": pick(99),
+            "max": round(values[-1], 3),
+        }
+
+
+def _get_or_create(name: str, kind):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = kind()
+        return metric
+
+
+def counter(name: str) -> Counter:
+    return _get_or_create(name, Counter)
+
+
+def gauge(name: str) -> Gauge:
+    return _get_or_create(name, Gauge)
+
+
+def histogram(name: str) -> Histogram:
+    return _get_or_create(name, Histogram)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Returns the current value of every registered metric."""
+    with _lock:
+        items = list(_metrics.items())
+    return {name: metric.snapshot() for name, metric in sorted(items)}
@@ -0,0 +1,230 @@
+# services/murf_ws.py
+import asyncio
+import base64
+import json
+import logging
+import uuid
+from typing import AsyncIterator, Dict, List
+
+import websockets
+
+import config
+from services import clients, metrics
+
+logger = logging.getLogger(__name__)
+
+MURF_WS_URL = "wss://api.murf.ai/v1/speech/stream-input"
+SAMPLE_RATE = 44100
+# Times a synthesis that has not produced audio yet is moved to a new connection
+MAX_REPLAYS = 2
+
+connects = metrics.counter("murf_ws_connects")
+replayed_contexts = metrics.counter("murf_ws_replayed_contexts")
+open_connections = metrics.gauge("murf_ws_connections")
+active_contexts = metrics.gauge("murf_ws_contexts")
+
+# Marks the end of a context's audio on its queue
+_FINAL = object()
+
+
+class _Context:
+    """One synthesis on a shared connection, addressed by its own context_id."""
+
+    __slots__ = ("id", "text", "voice_config", "audio", "started", "replays", "abandoned")
+
+    def __init__(self, text: str, voice_config: Dict[str, str]):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.voice_config = voice_config
+        self.audio = asyncio.Queue()
+        self.started = False
+        self.replays = 0
+        self.abandoned = False
+
+
+class MurfConnection:
+    """A stream-input websocket carrying several contexts at once."""
+
+    def __init__(self, api_key: str, pool: "MurfStreamPool"):
+        self._api_key = api_key
+        self._pool = pool
+        self._ws = None
+        self._reader = None
+        self.contexts: Dict[str, _Context] = {}
+        self.closed = False
+
+    async def connect(self):
+        uri = (
+            f"{MURF_WS_URL}"
+            f"?api-key={self._api_key}"
+            f"&sample_rate={SAMPLE_RATE}"
+            f"&channel_type=MONO"
+            f"&format=WAV"
+        )
+        self._ws = await websockets.connect(uri, open_timeout=config.MURF_WS_TIMEOUT)
+        self._reader = asyncio.create_task(self._read_loop())
+        connects.inc()
+        open_connections.inc()
+
+    async def start(self, context: _Context):
+        self.contexts[context.id] = context
+        try:
+            await self._ws.send(json.dumps({"context_id": context.id, "voice_config": context.voice_config}))
+            await self._ws.send(json.dumps({"context_id": context.id, "text": context.text, "end": True}))
+        except websockets.exceptions.ConnectionClosed:
+            # The reader sees the same close and replays the context
+            pass
+
+    async def clear(self, context: _Context):
+        """Stops Murf generating audio nobody will play."""
+        if self.contexts.pop(context.id, None) is None or self.closed:
+            return
+        try:
+            await self._ws.send(json.dumps({"context_id": context.id, "clear": True}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _read_loop(self):
+        try:
+            async for message in self._ws:
+                data = json.loads(message)
+                context = self.contexts.get(data.get("context_id"))
+                if context is None:
+                    if "error" in data:
+                        logger.warning(f"Murf websocket error: {data['error']}")
+                    continue
+                if data.get("audio"):
+                    context.started = True
+                    context.audio.put_nowait(base64.b64decode(data["audio"]))
+                if data.get("final"):
+                    del self.contexts[context.id]
+                    context.audio.put_nowait(_FINAL)
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.info(f"Murf websocket closed: {e}")
+        except Exception as e:
+            logger.error(f"Error in Murf websocket reader: {e}")
+        finally:
+            self.closed = True
+            open_connections.dec()
+            orphans, self.contexts = list(self.contexts.values()), {}
+            self._pool.reassign(orphans)
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+
+class MurfStreamPool:
+    """
+    Warm stream-input websockets for one Murf API key.
+
+    Each synthesis gets its own context_id on the least loaded connection,
+    and the reader of that connection routes audio back by context_id. When
+    a connection drops, contexts that have not received audio yet are sent
+    again on another connection; those already playing fail, since their
+    audio cannot be spliced.
+    """
+
+    def __init__(self, api_key: str, size: int = 2, max_contexts: int = 5):
+        self._api_key = api_key
+        self._size = size
+        self._max_contexts = max_contexts
+        self._connections: List[MurfConnection] = []
+        self._connecting = None
+
+    async def warm_up(self):
+        """Opens the pool's connections ahead of the first synthesis."""
+        while len(self._live()) < self._size:
+            await self._connect()
+
+    def _live(self) -> List[MurfConnection]:
+        self._connections = [connection for connection in self._connections if not connection.closed]
+        return self._connections
+
+    async def _connect(self) -> MurfConnection:
+        # Concurrent callers share one handshake instead of each opening a socket
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+            self._connecting.add_done_callback(self._connected)
+        return await asyncio.shield(self._connecting)
+
+    def _connected(self, _):
+        self._connecting = None
+
+    async def _open(self) -> MurfConnection:
+        connection = MurfConnection(self._api_key, self)
+        await connection.connect()
+        self._connections.append(connection)
+        return connection
+
+    async def _connection(self) -> MurfConnection:
+        """The least loaded connection with room for a context, opening one if none has."""
+        available = [connection for connection in self._live() if len(connection.contexts) < self._max_contexts]
+        if available:
+            return min(available, key=lambda connection: len(connection.contexts))
+        return await self._connect()
+
+    async def _dispatch(self, context: _Context) -> MurfConnection:
+        connection = await self._connection()
+        await connection.start(context)
+        return connection
+
+    def reassign(self, contexts: List[_Context]):
+        """Called by a connection that dropped with contexts still open."""
+        for context in contexts:
+            if context.started or context.replays >= MAX_REPLAYS:
+                context.audio.put_nowait(ConnectionError("Murf websocket closed mid-synthesis"))
+                continue
+            context.replays += 1
+            replayed_contexts.inc()
+            asyncio.create_task(self._replay(context))
+
+    async def _replay(self, context: _Context):
+        if context.abandoned:
+            return
+        try:
+            await self._dispatch(context)
+        except Exception as e:
+            context.audio.put_nowait(e)
+
+    async def synthesize(self, text: str, voice_config: Dict[str, str]) -> AsyncIterator[bytes]:
+        """Yields Murf's audio chunks for `text` as they arrive."""
+        context = _Context(text, voice_config)
+        await self._dispatch(context)
+        active_contexts.inc()
+        finished = False
+        try:
+            while True:
+                chunk = await asyncio.wait_for(context.audio.get(), config.MURF_WS_TIMEOUT)
+                if chunk is _FINAL:
+                    finished = True
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            active_contexts.dec()
+            if not finished:
+                context.abandoned = True
+                # A replay may have moved the context; clear it wherever it lives now
+                for connection in self._live():
+                    if context.id in connection.contexts:
+                        await connection.clear(context)
+
+    def close(self):
+        """Closes every connection; called when the pool is evicted from the registry."""
+        for connection in self._connections:
+            asyncio.ensure_future(connection.close())
+
+
+pools = clients.ClientRegistry(
+    "murf_ws",
+    lambda api_key: MurfStreamPool(api_key, config.MURF_WS_CONNECTIONS, config.MURF_WS_MAX_CONTEXTS),
+    lambda pool: pool.close(),
+    config.CLIENT_REGISTRY_SIZE, config.CLIENT_IDLE_TTL,
+)
+
+
+def pool(api_key: str) -> MurfStreamPool:
+    """Returns the shared websocket pool for this key. Must be called on the event loop."""
+    return pools.get(api_key)
@@ -0,0 +1,43 @@
+# services/playback.py
+import time
+from typing import List, Optional
+
+
+class PlaybackClock:
+    """
+    Estimates how far a client has got in playing one turn's audio.
+
+    The client plays chunks back to back as they arrive, so a chunk starts
+    playing when it is sent or when the audio before it ends, whichever is
+    later. Sending finishes long before playback does, so this, not the
+    turn's task, tells whether the user may still be hearing the turn.
+    `margin` covers the network and the client's own buffering.
+    """
+
+    def __init__(self, margin: float):
+        self._margin = margin
+        # When the audio sent so far will have finished playing
+        self._end = 0.0
+        # (sentence, when its audio starts playing), in the order sent
+        self._sentences = []
+        self._current = None
+
+    def sent(self, seconds: float, sentence: Optional[str] = None):
+        """Records audio handed to the client; `sentence` is None for audio that is not part of the reply."""
+        start = max(self._end, time.monotonic())
+        self._end = start + seconds
+        if sentence is not None and self._current is None:
+            self._current = sentence
+            self._sentences.append((sentence, start))
+
+    def sentence_done(self):
+        """Marks the end of the current sentence's audio."""
+        self._current = None
+
+    def playing(self) -> bool:
+        return time.monotonic() < self._end + self._margin
+
+    def heard(self) -> List[str]:
+        """Sentences whose audio had started playing by now."""
+        now = time.monotonic()
+        return [sentence for sentence, start in self._sentences if start <= now]
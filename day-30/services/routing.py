@@ -0,0 +1,154 @@
+# services/routing.py
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+from services import executors, llm, local_router, metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+speculative_turns = metrics.counter("speculative_turns")
+# Speculative calls whose result was thrown away because the router picked the other branch
+wasted_llm_calls = metrics.counter("speculative_wasted_llm_calls")
+wasted_search_calls = metrics.counter("speculative_wasted_search_calls")
+
+
+class Answer(NamedTuple):
+    """
+    The reply to one user turn.
+    `prompt` is what was sent to the LLM (None for canned replies that
+    should not be added to the chat history).
+    """
+    prompt: Optional[str]
+    chunks: AsyncIterator[str]
+
+
+async def _canned(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _search(user_query: str, serp_api_key: str) -> Optional[str]:
+    with tracing.start_span("search"):
+        return await llm.build_web_prompt_async(user_query, serp_api_key)
+
+
+async def _search_answer(user_query: str, search, history: List[Dict[str, Any]], gemini_api_key: str) -> Answer:
+    """Turns a (possibly prefetched) web search into a grounded LLM answer."""
+    try:
+        prompt = await search
+    except executors.PoolSaturated:
+        # Degrade to an answer from the model's own knowledge rather than failing the turn
+        return Answer(user_query, llm.stream_llm_response(user_query, history, gemini_api_key))
+    except Exception as e:
+        logger.error(f"Web search failed: {e}")
+        return Answer(None, _canned(llm.ERROR_RESPONSE))
+    if prompt is None:
+        return Answer(None, _canned(llm.NO_RESULTS_RESPONSE))
+    return Answer(prompt, llm.stream_llm_response(prompt, history, gemini_api_key))
+
+
+async def answer(
+    user_query: str,
+    history: List[Dict[str, Any]],
+    api_keys: Dict[str, str],
+    speculative: bool = False,
+    router: str = "local",
+    confidence_threshold: float = 0.0,
+    on_search: Optional[Callable[[], None]] = None,
+) -> Answer:
+    """
+    Decides whether the turn needs a web search and starts streaming the reply.
+    The "local" router answers in-process and only defers to the Gemini router
+    when its confidence is below `confidence_threshold`. `on_search` is called
+    as soon as the turn is known to wait on a web search.
+    """
+    with tracing.start_span("router", router=router) as span:
+        if router == "local":
+            decision = local_router.classify(user_query)
+            span.set(confidence=round(decision.confidence, 3))
+            if decision.confidence >= confidence_threshold or not api_keys.get("gemini"):
+                needs_search = decision.search
+            else:
+                local_router.llm_fallbacks.inc()
+                if speculative:
+                    span.set(speculative=True)
+                    return await _speculative_answer(user_query, history, api_keys, on_search)
+                needs_search = await llm.should_search_web_async(user_query, api_keys.get("gemini"))
+        elif speculative:
+            span.set(speculative=True)
+            return await _speculative_answer(user_query, history, api_keys, on_search)
+        else:
+            needs_search = await llm.should_search_web_async(user_query, api_keys.get("gemini"))
+        span.set(search=needs_search)
+
+    if needs_search:
+        if on_search:
+            on_search()
+        return await _search_answer(user_query, _search(user_query, api_keys.get("serpapi")), history, api_keys.get("gemini"))
+    return Answer(user_query, llm.stream_llm_response(user_query, history, api_keys.get("gemini")))
+
+
+async def _buffer(chunks: AsyncIterator[str], queue: asyncio.Queue):
+    try:
+        async for chunk in chunks:
+            queue.put_nowait(chunk)
+    except Exception as e:
+        # Raised again by _replay, in the task that reads the answer
+        queue.put_nowait(e)
+    finally:
+        queue.put_nowait(None)
+
+
+async def _replay(queue: asyncio.Queue, producer: asyncio.Task) -> AsyncIterator[str]:
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        producer.cancel()
+
+
+async def _speculative_answer(
+    user_query: str,
+    history: List[Dict[str, Any]],
+    api_keys: Dict[str, str],
+    on_search: Optional[Callable[[], None]] = None,
+) -> Answer:
+    """
+    Runs the search router, the plain LLM answer and the SerpAPI prefetch
+    concurrently, then commits to the branch the router picks and cancels
+    the other one. Only the committed branch's chunks are ever yielded.
+    """
+    speculative_turns.inc()
+    gemini_api_key = api_keys.get("gemini")
+
+    route = asyncio.create_task(llm.should_search_web_async(user_query, gemini_api_key))
+    search = asyncio.create_task(_search(user_query, api_keys.get("serpapi")))
+    # The plain answer is buffered, not forwarded, until the router has decided
+    plain_chunks = asyncio.Queue()
+    plain = asyncio.create_task(
+        _buffer(llm.stream_llm_response(user_query, history, gemini_api_key), plain_chunks)
+    )
+
+    try:
+        needs_search = await route
+    except BaseException:
+        plain.cancel()
+        search.cancel()
+        raise
+
+    if needs_search:
+        plain.cancel()
+        wasted_llm_calls.inc()
+        if on_search:
+            on_search()
+        return await _search_answer(user_query, search, history, gemini_api_key)
+
+    # The SerpAPI worker thread cannot be interrupted; its result is simply dropped
+    search.cancel()
+    wasted_search_calls.inc()
+    return Answer(user_query, _replay(plain_chunks, plain))
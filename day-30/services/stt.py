@@ -1,4 +1,9 @@
 # services/stt.py
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable
+
 import assemblyai as aai
 from assemblyai.streaming.v3 import (
     StreamingClient,
@@ -12,6 +17,16 @@ from assemblyai.streaming.v3 import (
     StreamingError,
 )
 
+from services import executors, metrics
+
+# Rate of the audio streamed to AssemblyAI; client audio is resampled to it
+SAMPLE_RATE = 16000
+
+handshake_ms = metrics.histogram("stt_handshake_ms")
+# Audio held per session while its STT session was connecting
+prebuffered_seconds = metrics.histogram("stt_prebuffered_seconds")
+prebuffer_dropped_seconds = metrics.counter("stt_prebuffer_dropped_seconds")
+
 def _on_begin(client: StreamingClient, event: BeginEvent):
     print(f"AAI session started: {event.id}")
 
@@ -30,13 +45,15 @@ class AssemblyAIStreamingTranscriber:
 
     def __init__(
         self,
-        sample_rate: int = 16000,
+        sample_rate: int = SAMPLE_RATE,
         on_partial_callback=None,
         on_final_callback=None,
-        api_key: str = None
+        api_key: str = None,
+        connect: bool = True,
     ):
         self.on_partial_callback = on_partial_callback
         self.on_final_callback = on_final_callback
+        self.sample_rate = sample_rate
 
         self.client = StreamingClient(
             StreamingClientOptions(
@@ -53,14 +70,26 @@ class AssemblyAIStreamingTranscriber:
             StreamingEvents.Turn,
             lambda client, event: self._on_turn(client, event),
         )
+        # Cleared once the session ends, so a pooled session is never handed out dead
+        self.alive = True
+        self.client.on(StreamingEvents.Error, self._on_closed)
+        self.client.on(StreamingEvents.Termination, self._on_closed)
+
+        if connect:
+            self.connect()
 
+    def connect(self):
+        """Opens the streaming session. Blocks for the websocket handshake."""
         self.client.connect(
             StreamingParameters(
-                sample_rate=sample_rate,
+                sample_rate=self.sample_rate,
                 format_turns=False,
             )
         )
 
+    def _on_closed(self, client: StreamingClient, event):
+        self.alive = False
+
     def _on_turn(self, client: StreamingClient, event: TurnEvent):
         text = (event.transcript or "").strip()
         if not text:
@@ -80,7 +109,88 @@ class AssemblyAIStreamingTranscriber:
                 self.on_partial_callback(text)
 
     def stream_audio(self, audio_chunk: bytes):
+        # Only enqueues the chunk; the SDK's writer thread does the network send
         self.client.stream(audio_chunk)
 
     def close(self):
-        self.client.disconnect(terminate=True)
\ No newline at end of file
+        self.alive = False
+        self.client.disconnect(terminate=True)
+
+    async def close_async(self):
+        """Closes the session off the event loop; disconnecting joins the SDK's threads."""
+        await executors.cleanup(self.close)
+
+
+async def open_transcriber(**kwargs) -> AssemblyAIStreamingTranscriber:
+    """Builds a transcriber and connects it in the STT pool so the handshake never blocks the event loop."""
+    transcriber = AssemblyAIStreamingTranscriber(connect=False, **kwargs)
+    await executors.run("stt", transcriber.connect)
+    return transcriber
+
+
+class ConnectingTranscriber:
+    """
+    Stands in for a transcriber while its session connects, so the websocket
+    keeps receiving audio during the handshake.
+
+    Audio streamed before the session is up is held, up to `max_buffered`
+    seconds with the oldest dropped beyond that, and sent once it connects
+    at `flush_speed` times real time (0 sends it all at once). Audio that
+    arrives meanwhile queues behind it, so order is kept. If connecting
+    fails, the next stream_audio() raises the error and later audio is dropped.
+    """
+
+    def __init__(self, connect: Awaitable[AssemblyAIStreamingTranscriber], max_buffered: float, flush_speed: float):
+        self._bytes_per_second = SAMPLE_RATE * 2
+        self._max_bytes = int(max_buffered * self._bytes_per_second)
+        self._flush_speed = flush_speed
+        self._buffer = deque()
+        self._buffered = 0
+        self._transcriber = None
+        self._error = None
+        self._closed = False
+        self._started = time.perf_counter_ns()
+        self._task = asyncio.ensure_future(self._connect(connect))
+
+    def stream_audio(self, audio_chunk: bytes):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if self._closed:
+            return
+        if self._transcriber is not None and not self._buffer:
+            self._transcriber.stream_audio(audio_chunk)
+            return
+        self._buffer.append(audio_chunk)
+        self._buffered += len(audio_chunk)
+        while self._buffered > self._max_bytes:
+            dropped = self._buffer.popleft()
+            self._buffered -= len(dropped)
+            prebuffer_dropped_seconds.inc(len(dropped) / self._bytes_per_second)
+
+    async def _connect(self, connect: Awaitable[AssemblyAIStreamingTranscriber]):
+        try:
+            transcriber = await connect
+        except Exception as e:
+            self._error = e
+            self._closed = True
+            self._buffer.clear()
+            return
+        handshake_ms.observe((time.perf_counter_ns() - self._started) / 1e6)
+        prebuffered_seconds.observe(self._buffered / self._bytes_per_second)
+        if self._closed:
+            await transcriber.close_async()
+            return
+        self._transcriber = transcriber
+        while self._buffer and not self._closed:
+            audio_chunk = self._buffer.popleft()
+            self._buffered -= len(audio_chunk)
+            transcriber.stream_audio(audio_chunk)
+            if self._flush_speed:
+                await asyncio.sleep(len(audio_chunk) / self._bytes_per_second / self._flush_speed)
+
+    async def close_async(self):
+        """Closes the session; one still connecting is closed as soon as it is up."""
+        self._closed = True
+        if self._transcriber is not None:
+            await self._transcriber.close_async()
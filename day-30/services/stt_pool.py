@@ -0,0 +1,146 @@
+# services/stt_pool.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Tuple
+
+import config
+from services import clients, metrics, stt
+
+logger = logging.getLogger(__name__)
+
+hits = metrics.counter("stt_pool_hits")
+misses = metrics.counter("stt_pool_misses")
+# Warm sessions closed unused because they reached STT_POOL_MAX_IDLE or died
+recycled = metrics.counter("stt_pool_recycled")
+connect_failures = metrics.counter("stt_pool_connect_failures")
+warm_sessions = metrics.gauge("stt_pool_warm")
+
+
+class TranscriberPool:
+    """
+    Connected AssemblyAI streaming sessions for one API key, ready to be
+    handed to the next websocket so it does not wait for the handshake.
+
+    The pool keeps as many sessions warm as connections are expected to
+    arrive during one session's warm lifetime, judged from the arrivals of
+    the last `window` seconds and capped at `max_size`. A session is only
+    opened for a whole expected arrival, so a key that connects less often
+    than once per `max_idle` keeps none warm. Every checkout is replaced in
+    the background. Sessions left unused for `max_idle` seconds are closed
+    and replaced before the provider times them out.
+    """
+
+    def __init__(self, api_key: str, max_size: int, max_idle: float, window: float):
+        self._api_key = api_key
+        self._max_size = max_size
+        self._max_idle = max_idle
+        self._window = window
+        # (transcriber, connected at), oldest first
+        self._warm: Deque[Tuple[stt.AssemblyAIStreamingTranscriber, float]] = deque()
+        self._connecting = 0
+        self._arrivals: Deque[float] = deque()
+        self._recycler = None
+        self._closed = False
+
+    async def acquire(self, on_partial_callback=None, on_final_callback=None) -> stt.AssemblyAIStreamingTranscriber:
+        """A connected transcriber with these callbacks, warm if one is ready."""
+        now = time.monotonic()
+        self._arrivals.append(now)
+        transcriber = self._take(now)
+        self._refill()
+        if transcriber is None:
+            misses.inc()
+            return await stt.open_transcriber(
+                on_partial_callback=on_partial_callback,
+                on_final_callback=on_final_callback,
+                api_key=self._api_key,
+            )
+        hits.inc()
+        transcriber.on_partial_callback = on_partial_callback
+        transcriber.on_final_callback = on_final_callback
+        return transcriber
+
+    def target(self) -> int:
+        """Sessions worth keeping warm: arrivals expected within one session's warm lifetime."""
+        now = time.monotonic()
+        while self._arrivals and now - self._arrivals[0] > self._window:
+            self._arrivals.popleft()
+        return min(self._max_size, math.floor(len(self._arrivals) * self._max_idle / self._window))
+
+    def _take(self, now: float):
+        while self._warm:
+            transcriber, connected_at = self._warm.popleft()
+            warm_sessions.dec()
+            if transcriber.alive and now - connected_at < self._max_idle:
+                return transcriber
+            self._discard(transcriber)
+        return None
+
+    def _refill(self):
+        if self._closed or not self._api_key:
+            return
+        for _ in range(self.target() - len(self._warm) - self._connecting):
+            self._connecting += 1
+            asyncio.ensure_future(self._open())
+        if self._recycler is None and (self._warm or self._connecting):
+            self._recycler = asyncio.ensure_future(self._recycle())
+
+    async def _open(self):
+        try:
+            transcriber = await stt.open_transcriber(api_key=self._api_key)
+        except Exception as e:
+            connect_failures.inc()
+            logger.warning(f"Could not open a warm AssemblyAI session: {e}")
+            return
+        finally:
+            self._connecting -= 1
+        if self._closed:
+            self._discard(transcriber)
+            return
+        self._warm.append((transcriber, time.monotonic()))
+        warm_sessions.inc()
+
+    async def _recycle(self):
+        """Replaces warm sessions as they reach `max_idle`; stops once the pool has drained."""
+        try:
+            while not self._closed and (self._warm or self._connecting or self.target()):
+                oldest = self._warm[0][1] if self._warm else time.monotonic()
+                await asyncio.sleep(max(0.0, oldest + self._max_idle - time.monotonic()))
+                now = time.monotonic()
+                while self._warm and (now - self._warm[0][1] >= self._max_idle or not self._warm[0][0].alive):
+                    transcriber, _ = self._warm.popleft()
+                    warm_sessions.dec()
+                    self._discard(transcriber)
+                self._refill()
+        finally:
+            self._recycler = None
+
+    def _discard(self, transcriber: stt.AssemblyAIStreamingTranscriber):
+        recycled.inc()
+        asyncio.ensure_future(transcriber.close_async())
+
+    def close(self):
+        """Closes every warm session; called when the pool is evicted from the registry."""
+        self._closed = True
+        while self._warm:
+            transcriber, _ = self._warm.popleft()
+            warm_sessions.dec()
+            asyncio.ensure_future(transcriber.close_async())
+        if self._recycler is not None:
+            self._recycler.cancel()
+
+
+pools = clients.ClientRegistry(
+    "stt_pool",
+    lambda api_key: TranscriberPool(api_key, config.STT_POOL_MAX_SIZE, config.STT_POOL_MAX_IDLE, config.STT_POOL_WINDOW),
+    lambda pool: pool.close(),
+    config.CLIENT_REGISTRY_SIZE, config.CLIENT_IDLE_TTL,
+)
+
+
+def pool(api_key: str) -> TranscriberPool:
+    """Returns the shared session pool for this key. Must be called on the event loop."""
+    return pools.get(api_key)
@@ -0,0 +1,112 @@
+# services/synthesis.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from services import audio, metrics
+
+logger = logging.getLogger(__name__)
+
+# Sentences submitted but not yet sent to the client, across all sessions
+queue_depth = metrics.gauge("tts_queue_depth")
+# Time a sentence's first audio waited for an earlier, slower sentence
+hol_blocking_ms = metrics.histogram("tts_hol_blocking_ms")
+synthesis_ms = metrics.histogram("tts_synthesis_ms")
+failed_sentences = metrics.counter("tts_failed_sentences")
+
+
+class SynthesisStage:
+    """
+    Synthesizes up to `concurrency` sentences at once and emits their audio
+    strictly in sentence order.
+
+    Audio of the sentence at the head of the line is forwarded chunk by
+    chunk as it streams in; later sentences buffer their chunks until they
+    reach the head. `session_slots` is shared by every turn of a websocket
+    session so the session as a whole never has more than its cap of Murf
+    calls in flight.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], AsyncIterator[audio.PcmChunk]],
+        emit: Callable[[str, audio.PcmChunk], Awaitable[None]],
+        concurrency: int,
+        session_slots: asyncio.Semaphore,
+        on_spoken: Optional[Callable[[str], None]] = None,
+    ):
+        self._synthesize = synthesize
+        self._emit = emit
+        self._on_spoken = on_spoken
+        self._turn_slots = asyncio.Semaphore(concurrency)
+        self._session_slots = session_slots
+        # (sentence, chunk queue, task) in sentence order; the head is the one being emitted
+        self._pending = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._emitter = asyncio.create_task(self._emit_in_order())
+
+    async def submit(self, sentence: str):
+        """Starts synthesizing a sentence; waits while `concurrency` sentences are in flight."""
+        await self._turn_slots.acquire()
+        chunks = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize_one(sentence, chunks))
+        self._pending.append((sentence, chunks, task))
+        queue_depth.inc()
+        self._ready.set()
+
+    async def _synthesize_one(self, sentence: str, chunks: asyncio.Queue):
+        try:
+            async with self._session_slots:
+                started = time.perf_counter()
+                async for chunk in self._synthesize(sentence):
+                    chunks.put_nowait((chunk, time.perf_counter()))
+                synthesis_ms.observe((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logger.error(f"TTS Error: {e}")
+            failed_sentences.inc()
+        finally:
+            self._turn_slots.release()
+            chunks.put_nowait(None)
+
+    async def _emit_in_order(self):
+        while True:
+            if not self._pending:
+                if self._closed:
+                    return
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            sentence, chunks, _ = self._pending[0]
+            emitted = False
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    break
+                chunk, arrived_at = item
+                if not emitted:
+                    # Time the sentence's first audio waited for earlier, slower sentences
+                    hol_blocking_ms.observe((time.perf_counter() - arrived_at) * 1000)
+                    emitted = True
+                await self._emit(sentence, chunk)
+            self._pending.popleft()
+            queue_depth.dec()
+            if emitted and self._on_spoken is not None:
+                self._on_spoken(sentence)
+
+    async def drain(self):
+        """Waits until every submitted sentence has been emitted."""
+        self._closed = True
+        self._ready.set()
+        await self._emitter
+
+    def cancel(self):
+        """Abandons all pending sentences."""
+        self._closed = True
+        for _, _, task in self._pending:
+            task.cancel()
+        queue_depth.dec(len(self._pending))
+        self._pending.clear()
+        self._emitter.cancel()
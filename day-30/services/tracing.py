@@ -0,0 +1,179 @@
+# services/tracing.py
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The trace of the turn being processed by the current task, if any
+current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Span:
+    """A timed step of a turn. Times are perf_counter_ns values."""
+
+    __slots__ = ("trace", "id", "parent", "name", "start", "end", "attrs")
+
+    def __init__(self, trace: "Trace", span_id: int, parent: Optional[int], name: str, start: int, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.start = start
+        self.end = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def event(self, name: str, **attrs) -> "Span":
+        """Records a zero-length child span, e.g. a first byte or a frame sent."""
+        return self.trace.event(name, parent=self, **attrs)
+
+    def child(self, name: str, **attrs) -> "Span":
+        return self.trace.start_span(name, parent=self, **attrs)
+
+    def finish(self, **attrs):
+        if attrs:
+            self.attrs.update(attrs)
+        if self.end is None:
+            self.end = time.perf_counter_ns()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+
+
+class _NullSpan:
+    """Stands in for a span when no trace is active so callers never need to check."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def event(self, name: str, **attrs):
+        return self
+
+    def child(self, name: str, **attrs):
+        return self
+
+    def finish(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """All spans of one user turn, rooted at a "turn" span."""
+
+    def __init__(self, session_id: str, turn_id: int, start: int = None, **attrs):
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.root = Span(self, 0, None, "turn", start or time.perf_counter_ns(), attrs)
+        self.spans.append(self.root)
+
+    def start_span(self, name: str, parent: Span = None, **attrs) -> Span:
+        # list.append is atomic, so worker threads may add spans too
+        span = Span(self, len(self.spans), (parent or self.root).id, name, time.perf_counter_ns(), attrs)
+        self.spans.append(span)
+        return span
+
+    def event(self, name: str, parent: Span = None, at: int = None, **attrs) -> Span:
+        span = self.start_span(name, parent, **attrs)
+        if at is not None:
+            span.start = at
+        span.end = span.start
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        origin = self.root.start
+        end = self.root.end or time.perf_counter_ns()
+        return {
+            "session_id": self.session_id,
+            "turn_id": self.turn_id,
+            "started_at": self.started_at,
+            "duration_ms": round((end - origin) / 1e6, 3),
+            "spans": [
+                {
+                    "id": span.id,
+                    "parent": span.parent,
+                    "name": span.name,
+                    "start_ms": round((span.start - origin) / 1e6, 3),
+                    "end_ms": None if span.end is None else round((span.end - origin) / 1e6, 3),
+                    **span.attrs,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+def start_span(name: str, parent: Span = None, **attrs):
+    """Starts a span on the current turn's trace; a no-op outside of a traced turn."""
+    trace = current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return trace.start_span(name, parent, **attrs)
+
+
+def event(name: str, parent: Span = None, **attrs):
+    trace = current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return trace.event(name, parent, **attrs)
+
+
+class TraceRecorder:
+    """
+    Keeps the last `ring_size` finished traces in memory and appends every
+    trace to a rotating JSONL file from a background thread, so serialization
+    and disk I/O never run on the event loop.
+    """
+
+    def __init__(self, path: Optional[str], ring_size: int, max_bytes: int, backup_count: int):
+        self.recent = deque(maxlen=ring_size)
+        self._queue = queue.SimpleQueue()
+        self._handler = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+            threading.Thread(target=self._write_loop, name="trace-writer", daemon=True).start()
+
+    def record(self, trace: Trace):
+        self.recent.append(trace)
+        if self._handler:
+            self._queue.put(trace)
+
+    def _write_loop(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                line = json.dumps(trace.to_dict(), default=str)
+                self._handler.handle(logging.makeLogRecord({"msg": line}))
+            except Exception as e:
+                logger.error(f"Failed to write trace: {e}")
+
+    def recent_turns(self, limit: int) -> List[Dict[str, Any]]:
+        """Newest first."""
+        return [trace.to_dict() for trace in list(self.recent)[::-1][:limit]]
@@ -1,40 +1,162 @@
 # services/tts.py
-import requests
-from typing import List, Dict, Any
-from murf import Murf
-from pathlib import Path
+import asyncio
+from typing import AsyncIterator, Iterator
 import logging
-import os
+import threading
+
+import config
+from services import audio, clients, executors, llm, murf_ws, tts_cache
 
 logger = logging.getLogger(__name__)
 
 MURF_API_URL = "https://api.murf.ai/v1/speech"
 
-# Ensure uploads folder exists
-UPLOADS_DIR = Path(__file__).resolve().parent.parent / "uploads"
-UPLOADS_DIR.mkdir(exist_ok=True)
+VOICE_ID = "en-US-ken"
+VOICE_STYLE = "Conversational"
+AUDIO_FORMAT = "WAV"
 
-def speak(text: str, api_key: str, output_file: str = "stream_output.wav"):
-    """
-    Convert text to speech using Murf API and save audio in uploads folder.
-    """
-    client = Murf(api_key=api_key)
+# Fixed replies worth keeping on disk whatever their length
+PERSISTED_PHRASES = {llm.ERROR_RESPONSE, llm.NO_RESULTS_RESPONSE}
+
+# Marks the end of a stream on the chunk queue
+_DONE = object()
 
-    file_path = UPLOADS_DIR / output_file
 
-    # Start with a clean file
-    open(file_path, "wb").close()
+cache = tts_cache.TTSCache(
+    config.TTS_CACHE_DIR, config.TTS_CACHE_MEMORY_BYTES, config.TTS_CACHE_DISK_BYTES,
+    lambda chunks: audio.to_wav(audio.join_chunks(chunks)), audio.from_wav,
+) if config.TTS_CACHE_ENABLED else None
 
-    res = client.text_to_speech.stream(
+
+def murf_chunks(text: str, api_key: str) -> Iterator[bytes]:
+    """Blocking iterator over the raw audio chunks Murf streams back."""
+    client = clients.murf(api_key)
+    return client.text_to_speech.stream(
         text=text,
-        voice_id="en-US-ken",
-        style="Conversational"
+        voice_id=VOICE_ID,
+        style=VOICE_STYLE,
+        format=AUDIO_FORMAT,
     )
 
-    audio_bytes = b""
-    for audio_chunk in res:
-        audio_bytes += audio_chunk
-        with open(file_path, "ab") as f:
-            f.write(audio_chunk)
 
-    return audio_bytes
\ No newline at end of file
+async def stream_speech(
+    text: str, api_key: str, cancelled: threading.Event = None, persist: bool = False
+) -> AsyncIterator[audio.PcmChunk]:
+    """
+    Convert text to speech, yielding the audio as it arrives.
+
+    Short texts are served from the TTS cache when possible, and identical
+    texts synthesized at the same time share one Murf call. Only `persist`
+    texts, fixed replies and very short ones are written to disk.
+    """
+    if cache is None or len(text) > config.TTS_CACHE_MAX_CHARS:
+        async for chunk in _synthesize(text, api_key, cancelled):
+            yield chunk
+        return
+    # The backends differ in sample rate, so they do not share entries
+    audio_format = f"{AUDIO_FORMAT}/{config.TTS_BACKEND}/{config.OUTPUT_SAMPLE_RATE}"
+    key = tts_cache.cache_key(text, VOICE_ID, VOICE_STYLE, audio_format)
+    persist = persist or text in PERSISTED_PHRASES or len(text) <= config.TTS_CACHE_DISK_MAX_CHARS
+    # A shared synthesis is stopped by the cache once nobody reads it, not by one turn's cancel flag
+    async for chunk in cache.stream(key, lambda: _synthesize(text, api_key), persist):
+        yield chunk
+
+
+async def warm_up(api_key: str):
+    """Opens the Murf websockets for this key before the first turn needs them."""
+    if config.TTS_BACKEND != "websocket" or not api_key:
+        return
+    try:
+        await murf_ws.pool(api_key).warm_up()
+    except Exception as e:
+        logger.warning(f"Could not warm up Murf websockets: {e}")
+
+
+def _synthesize(text: str, api_key: str, cancelled: threading.Event = None) -> AsyncIterator[audio.PcmChunk]:
+    if config.TTS_BACKEND == "websocket":
+        chunks = _murf_ws_stream(text, api_key)
+    else:
+        chunks = _murf_stream(text, api_key, cancelled)
+    if config.OUTPUT_SAMPLE_RATE:
+        return _resampled(chunks, config.OUTPUT_SAMPLE_RATE)
+    return chunks
+
+
+async def _resampled(chunks: AsyncIterator[audio.PcmChunk], rate: int) -> AsyncIterator[audio.PcmChunk]:
+    """Converts 16-bit PCM to mono `rate` Hz as it streams past; anything else passes through."""
+    resampler = None
+    fmt = (1, rate, 16)
+    try:
+        async for chunk in chunks:
+            if chunk.fmt is None or chunk.fmt[2] != 16 or chunk.fmt[:2] == (1, rate):
+                yield chunk
+                continue
+            if resampler is None:
+                resampler = audio.PolyphaseResampler(chunk.fmt[1], rate, chunk.fmt[0])
+            pcm = resampler.process(chunk.data)
+            if pcm:
+                yield audio.PcmChunk(pcm, fmt)
+        if resampler is not None:
+            pcm = resampler.flush()
+            if pcm:
+                yield audio.PcmChunk(pcm, fmt)
+    finally:
+        # Stop the Murf stream right away rather than when it is garbage collected
+        await chunks.aclose()
+
+
+async def _murf_ws_stream(text: str, api_key: str) -> AsyncIterator[audio.PcmChunk]:
+    """
+    Streams Murf audio over a shared stream-input websocket.
+
+    Native async, so it only holds a TTS pool slot. Yields nothing when the
+    pool is saturated, like a degraded HTTP call.
+    """
+    try:
+        async with executors.limit("tts"):
+            segmenter = audio.WavSegmenter()
+            async for chunk in murf_ws.pool(api_key).synthesize(text, {"voiceId": VOICE_ID, "style": VOICE_STYLE}):
+                for segment in segmenter.feed(chunk):
+                    yield segment
+            for segment in segmenter.finish():
+                yield segment
+    except executors.PoolSaturated:
+        return
+
+
+async def _murf_stream(text: str, api_key: str, cancelled: threading.Event = None) -> AsyncIterator[audio.PcmChunk]:
+    """
+    Streams Murf audio as PCM chunks.
+
+    The blocking Murf stream is read in the TTS pool and handed over chunk by
+    chunk. Stops reading early once `cancelled` is set or the caller stops
+    iterating. Yields nothing when the TTS pool degrades the call.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        segmenter = audio.WavSegmenter()
+        for chunk in murf_chunks(text, api_key):
+            if stop.is_set() or (cancelled is not None and cancelled.is_set()):
+                return
+            for segment in segmenter.feed(chunk):
+                loop.call_soon_threadsafe(chunks.put_nowait, segment)
+        for segment in segmenter.finish():
+            loop.call_soon_threadsafe(chunks.put_nowait, segment)
+
+    # Queued after every chunk the worker handed over, since those were scheduled first
+    producer = asyncio.ensure_future(executors.run("tts", produce))
+    producer.add_done_callback(lambda _: chunks.put_nowait(_DONE))
+    try:
+        while True:
+            segment = await chunks.get()
+            if segment is _DONE:
+                break
+            yield segment
+        producer.result()
+    finally:
+        stop.set()
+        if not producer.done():
+            producer.cancel()
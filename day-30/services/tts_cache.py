@@ -0,0 +1,228 @@
+# services/tts_cache.py
+import asyncio
+import hashlib
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+memory_hits = metrics.counter("tts_cache_hits")
+disk_hits = metrics.counter("tts_cache_disk_hits")
+misses = metrics.counter("tts_cache_misses")
+# Requests that joined a synthesis already in flight for the same audio
+coalesced = metrics.counter("tts_cache_coalesced")
+served_bytes = metrics.counter("tts_cache_served_bytes")
+memory_bytes = metrics.gauge("tts_cache_memory_bytes")
+disk_bytes = metrics.gauge("tts_cache_disk_bytes")
+
+SUFFIX = ".audio"
+
+
+def cache_key(text: str, voice_id: str, style: str, audio_format: str) -> str:
+    """Content address of a synthesis; whitespace differences do not change the audio."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256("\x1f".join((normalized, voice_id, style, audio_format)).encode()).hexdigest()
+
+
+class _Fill:
+    """One synthesis in flight, read by every request for the same key."""
+
+    def __init__(self):
+        self.segments: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task = None
+        # Replaced on every change; waiters hold on to the one they saw
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    A size-bounded LRU in memory sits in front of a size-bounded directory
+    that survives restarts; entries streamed with `persist=False` stay in
+    memory only. Identical requests made while a synthesis is in
+    flight share it instead of calling Murf again, and still receive its
+    audio as it streams in. A synthesis is only dropped once every request
+    reading it has gone away. `join` turns the streamed segments into the
+    single audio file that is stored, and `split` turns a stored file back
+    into the segment served on later hits.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        max_memory_bytes: int,
+        max_disk_bytes: int,
+        join: Callable[[List[Any]], bytes] = b"".join,
+        split: Callable[[bytes], Any] = bytes,
+    ):
+        self._join = join
+        self._split = split
+        self._max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._inflight = {}
+
+        self._directory = Path(directory) if directory else None
+        self._max_disk_bytes = max_disk_bytes
+        # key -> file size, oldest first; shared with the writer thread
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._disk_lock = threading.Lock()
+        self._writes = queue.SimpleQueue()
+        if self._directory:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+            threading.Thread(target=self._write_loop, name="tts-cache-writer", daemon=True).start()
+
+    async def stream(self, key: str, synthesize: Callable[[], AsyncIterator[Any]], persist: bool = True) -> AsyncIterator[Any]:
+        """Yields the audio for `key`, from cache or from `synthesize()` shared with concurrent callers."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            memory_hits.inc()
+            served_bytes.inc(len(audio))
+            yield self._split(audio)
+            return
+
+        fill = self._inflight.get(key)
+        if fill is None:
+            fill = _Fill()
+            fill.task = asyncio.create_task(self._fill(key, fill, synthesize, persist))
+            self._inflight[key] = fill
+        else:
+            coalesced.inc()
+
+        fill.subscribers += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(fill.segments):
+                    yield fill.segments[sent]
+                    sent += 1
+                if fill.done:
+                    break
+                await fill.changed.wait()
+            if fill.error is not None:
+                raise fill.error
+        finally:
+            fill.subscribers -= 1
+            if fill.subscribers == 0 and not fill.done:
+                # Nobody is listening any more, e.g. every requesting turn was interrupted
+                self._inflight.pop(key, None)
+                fill.task.cancel()
+
+    async def _fill(self, key: str, fill: _Fill, synthesize: Callable[[], AsyncIterator[Any]], persist: bool):
+        try:
+            audio = await self._read_disk(key) if persist else None
+            if audio is not None:
+                disk_hits.inc()
+                served_bytes.inc(len(audio))
+                fill.segments.append(self._split(audio))
+                fill.notify()
+            else:
+                misses.inc()
+                async for segment in synthesize():
+                    fill.segments.append(segment)
+                    fill.notify()
+                # Nothing came back (e.g. the TTS pool degraded the call): nothing to keep
+                audio = self._join(fill.segments) if fill.segments else None
+                if audio and persist:
+                    self._write_disk(key, audio)
+            if audio:
+                self._remember(key, audio)
+        except asyncio.CancelledError:
+            fill.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            fill.error = e
+        finally:
+            fill.done = True
+            fill.notify()
+            if self._inflight.get(key) is fill:
+                del self._inflight[key]
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self._max_memory_bytes:
+            return
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self._max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+        memory_bytes.set(self._memory_size)
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / (key + SUFFIX)
+
+    def _load_index(self):
+        files = []
+        for path in self._directory.glob("*/*" + SUFFIX):
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_size += size
+        disk_bytes.set(self._disk_size)
+        logger.info(f"TTS cache: {len(self._disk)} entries on disk ({self._disk_size} bytes).")
+
+    async def _read_disk(self, key: str) -> Optional[bytes]:
+        if self._directory is None:
+            return None
+        with self._disk_lock:
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._path(key).read_bytes)
+        except OSError as e:
+            logger.warning(f"TTS cache entry unreadable, dropping it: {e}")
+            with self._disk_lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        if self._directory is not None and len(audio) <= self._max_disk_bytes:
+            self._writes.put((key, audio))
+
+    def _write_loop(self):
+        while True:
+            key, audio = self._writes.get()
+            path = self._path(key)
+            try:
+                path.parent.mkdir(exist_ok=True)
+                temp = path.with_suffix(".tmp")
+                temp.write_bytes(audio)
+                os.replace(temp, path)
+            except OSError as e:
+                logger.error(f"Failed to write TTS cache entry: {e}")
+                continue
+
+            evicted = []
+            with self._disk_lock:
+                self._disk_size += len(audio) - self._disk.pop(key, 0)
+                self._disk[key] = len(audio)
+                while self._disk_size > self._max_disk_bytes:
+                    old_key, size = self._disk.popitem(last=False)
+                    self._disk_size -= size
+                    evicted.append(old_key)
+                disk_bytes.set(self._disk_size)
+            for old_key in evicted:
+                try:
+                    self._path(old_key).unlink()
+                except OSError:
+                    pass
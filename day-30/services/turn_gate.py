@@ -0,0 +1,124 @@
+# services/turn_gate.py
+import asyncio
+import re
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Callable, List
+
+from services import metrics
+
+# Transcripts remembered per session for duplicate detection
+MAX_RECENT_TURNS = 32
+
+coalesced_turns = metrics.counter("turns_coalesced")
+dropped_turns = metrics.counter("turns_dropped_duplicate")
+
+_NORMALIZE = re.compile(r"[^a-z0-9 ]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_NORMALIZE.sub(" ", text.lower()).split())
+
+
+class TurnGate:
+    """
+    Sits between end-of-turn events and the LLM for one session.
+
+    Fragments that arrive within `window` seconds of each other are merged
+    into a single turn. A fragment that matches one still pending, or a
+    turn accepted in the last `duplicate_ttl` seconds (after normalization,
+    at `similarity` or above), is dropped before merging, and so is a
+    merged turn that matches an accepted one. A fragment that repeats a
+    pending one and goes on replaces it. Must be used from the event loop
+    thread.
+    """
+
+    def __init__(
+        self,
+        on_turn: Callable[[str, int], None],
+        window: float = 0.3,
+        duplicate_ttl: float = 3.0,
+        similarity: float = 0.9,
+    ):
+        self._on_turn = on_turn
+        self._window = window
+        self._duplicate_ttl = duplicate_ttl
+        self._similarity = similarity
+        self._fragments: List[str] = []
+        self._first_received_at = None
+        self._timer = None
+        # normalized transcript -> loop time it was accepted, oldest first
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+
+    def submit(self, text: str, received_at: int):
+        """Queues an end-of-turn transcript; `received_at` is a perf_counter_ns timestamp."""
+        normalized = _normalize(text)
+        for i, fragment in enumerate(self._fragments):
+            pending = _normalize(fragment)
+            if self._similar(pending, normalized) or normalized.startswith(pending + " "):
+                # AssemblyAI re-sends a turn once it is formatted; keep the formatted copy
+                self._fragments[i] = text
+                dropped_turns.inc()
+                return
+        if self._is_recent(normalized):
+            dropped_turns.inc()
+            return
+
+        if not self._fragments:
+            self._first_received_at = received_at
+        else:
+            coalesced_turns.inc()
+        self._fragments.append(text)
+        if self._timer:
+            self._timer.cancel()
+        if self._window > 0:
+            self._timer = asyncio.get_running_loop().call_later(self._window, self._flush)
+        else:
+            self._flush()
+
+    def carry(self, text: str, received_at: int):
+        """
+        Puts back the text of a turn that was cancelled before it was
+        answered, to be merged with the next fragment submitted.
+        """
+        # It was never answered, so it must not count against the merged turn as a duplicate
+        self._recent.pop(_normalize(text), None)
+        if not self._fragments:
+            self._first_received_at = received_at
+        self._fragments.insert(0, text)
+
+    def _flush(self):
+        self._timer = None
+        fragments, self._fragments = self._fragments, []
+        text = " ".join(fragments)
+        normalized = _normalize(text)
+        if self._is_recent(normalized):
+            dropped_turns.inc()
+            return
+        self._remember(normalized)
+        if len(fragments) > 1:
+            # Late formatted copies of a merged fragment are duplicates too
+            for fragment in fragments:
+                self._remember(_normalize(fragment))
+        self._on_turn(text, self._first_received_at)
+
+    def _similar(self, a: str, b: str) -> bool:
+        return a == b or SequenceMatcher(None, a, b).ratio() >= self._similarity
+
+    def _is_recent(self, normalized: str) -> bool:
+        """Whether a turn like this one was accepted in the last `duplicate_ttl` seconds."""
+        now = asyncio.get_running_loop().time()
+        # Forget turns older than the TTL; entries are kept in acceptance order
+        while self._recent and next(iter(self._recent.values())) < now - self._duplicate_ttl:
+            self._recent.popitem(last=False)
+        return any(self._similar(previous, normalized) for previous in self._recent)
+
+    def _remember(self, normalized: str):
+        self._recent[normalized] = asyncio.get_running_loop().time()
+        if len(self._recent) > MAX_RECENT_TURNS:
+            self._recent.popitem(last=False)
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
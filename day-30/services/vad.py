@@ -0,0 +1,117 @@
+# services/vad.py
+from collections import deque
+
+import numpy as np
+
+from services import metrics
+
+# Analysis frame; also the smallest unit forwarded, and AssemblyAI's minimum message length
+FRAME_MS = 50
+
+# Audio sent to STT, including pre-roll and keep-alive frames
+forwarded_seconds = metrics.counter("vad_forwarded_seconds")
+# Inbound audio not sent to STT, counted once it has left the pre-roll unsent
+saved_seconds = metrics.counter("vad_saved_seconds")
+speech_onsets = metrics.counter("vad_speech_onsets")
+
+
+class SpeechGate:
+    """
+    Decides which inbound 16-bit mono PCM is worth sending to STT.
+
+    Audio is cut into FRAME_MS frames and each frame's energy and zero-crossing
+    rate are computed in one vectorized pass. A frame is speech when it is
+    louder than `threshold_db` dBFS, or within `zcr_margin_db` of it with a
+    zero-crossing rate above `zcr_threshold` (quiet fricatives such as "s" and
+    "f"). The gate stays open for `hangover` seconds after the last speech
+    frame, long enough for the STT's own end-of-turn silence detection, and
+    opens with the last `preroll` seconds of closed audio so word onsets are
+    never clipped. While closed, one silent frame is sent every
+    `keepalive_interval` seconds of audio to keep the session alive.
+
+    process() takes chunks of any size and returns the bytes to forward,
+    always a whole number of frames (possibly none).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        threshold_db: float,
+        zcr_threshold: float,
+        zcr_margin_db: float,
+        hangover: float,
+        preroll: float,
+        keepalive_interval: float,
+    ):
+        self._frame_samples = sample_rate * FRAME_MS // 1000
+        self._frame_bytes = self._frame_samples * 2
+        self._frame_seconds = FRAME_MS / 1000
+        self._threshold = threshold_db
+        self._zcr_threshold = zcr_threshold
+        self._zcr_floor = threshold_db - zcr_margin_db
+        self._hangover_frames = round(hangover / self._frame_seconds)
+        self._keepalive_frames = max(1, round(keepalive_interval / self._frame_seconds))
+        self._keepalive = bytes(self._frame_bytes)
+        self._preroll = deque(maxlen=round(preroll / self._frame_seconds))
+        self._pending = b""
+        # Index of the next frame, and of the last speech frame seen
+        self._frame_index = 0
+        self._last_speech = -(1 << 62)
+        self._open = False
+        self._closed_run = 0
+
+    def process(self, chunk: bytes) -> bytes:
+        data = self._pending + chunk if self._pending else chunk
+        count = len(data) // self._frame_bytes
+        self._pending = data[count * self._frame_bytes:]
+        if not count:
+            return b""
+
+        frames = np.frombuffer(data, dtype="<i2", count=count * self._frame_samples).reshape(count, self._frame_samples)
+        is_open = self._classify(frames)
+
+        view = memoryview(data)
+        out = []
+        sent = 0
+        dropped = 0
+        for i in range(count):
+            frame = view[i * self._frame_bytes:(i + 1) * self._frame_bytes]
+            if is_open[i]:
+                if not self._open:
+                    self._open = True
+                    speech_onsets.inc()
+                    sent += len(self._preroll)
+                    out.extend(self._preroll)
+                    self._preroll.clear()
+                out.append(frame)
+                sent += 1
+                self._closed_run = 0
+                continue
+            self._open = False
+            if len(self._preroll) == self._preroll.maxlen:
+                dropped += 1
+            self._preroll.append(bytes(frame))
+            self._closed_run += 1
+            if self._closed_run >= self._keepalive_frames:
+                self._closed_run = 0
+                out.append(self._keepalive)
+                sent += 1
+
+        forwarded_seconds.inc(sent * self._frame_seconds)
+        saved_seconds.inc(dropped * self._frame_seconds)
+        return b"".join(out)
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        """Whether the gate is open for each frame: speech, or within the hangover after it."""
+        samples = frames.astype(np.float32)
+        energy = np.mean(samples * samples, axis=1)
+        level_db = 10 * np.log10(energy / (32768.0 * 32768.0) + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self._frame_samples - 1)
+        speech = (level_db > self._threshold) | ((level_db > self._zcr_floor) & (zcr > self._zcr_threshold))
+
+        positions = np.arange(self._frame_index, self._frame_index + len(frames), dtype=np.int64)
+        last_speech = np.maximum.accumulate(np.where(speech, positions, self._last_speech))
+        self._last_speech = int(last_speech[-1])
+        self._frame_index += len(frames)
+        return positions - last_speech <= self._hangover_frames
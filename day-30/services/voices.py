@@ -0,0 +1,154 @@
+# services/voices.py
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import config
+from services import executors, metrics
+
+logger = logging.getLogger(__name__)
+
+MURF_VOICES_URL = "https://api.murf.ai/v1/speech/voices"
+# Seconds between refresh attempts while Murf keeps failing and the stale copy is served
+RETRY_INTERVAL = 30.0
+
+refreshes = metrics.counter("voices_refreshes")
+# Refreshes answered with 304 Not Modified
+revalidated = metrics.counter("voices_revalidated")
+refresh_failures = metrics.counter("voices_refresh_failures")
+stale_served = metrics.counter("voices_stale_served")
+
+
+class _Fetch:
+    """The outcome of one request to the Murf voices API."""
+
+    __slots__ = ("voices", "etag", "last_modified", "not_modified")
+
+    def __init__(self, voices=None, etag=None, last_modified=None, not_modified=False):
+        self.voices = voices
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+
+def _fetch(api_key: str, etag: Optional[str], last_modified: Optional[str]) -> _Fetch:
+    headers = {"Accept": "application/json", "api-key": api_key}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = requests.get(MURF_VOICES_URL, headers=headers, timeout=10)
+    if response.status_code == 304:
+        return _Fetch(etag=etag, last_modified=last_modified, not_modified=True)
+    response.raise_for_status()
+    return _Fetch(response.json(), response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+class VoiceCatalog:
+    """
+    Murf's voice catalogue, cached in memory and indexed by locale, gender
+    and style.
+
+    Lookups are answered from memory. Once the copy is older than `ttl`
+    seconds the next lookup starts a background revalidation (conditional,
+    so an unchanged catalogue costs a 304) and is served the stale copy
+    meanwhile; concurrent lookups share that one refresh. If Murf is down
+    the stale copy keeps being served, retried every RETRY_INTERVAL
+    seconds. Only the very first lookup waits.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._voices: List[Dict[str, Any]] = []
+        self._by_locale: Dict[str, List[int]] = {}
+        self._by_gender: Dict[str, List[int]] = {}
+        self._by_style: Dict[str, List[int]] = {}
+        self._etag = None
+        self._last_modified = None
+        self._fetched_at = None
+        self._next_refresh = 0.0
+        self._refresh = None
+
+    @property
+    def stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self._ttl
+
+    async def voices(
+        self,
+        api_key: Optional[str],
+        locale: Optional[str] = None,
+        gender: Optional[str] = None,
+        style: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        if self._fetched_at is None:
+            await self._refreshed(api_key)
+        elif self.stale:
+            stale_served.inc()
+            if api_key and time.monotonic() >= self._next_refresh:
+                self._refreshed(api_key)
+        return self._filter(locale, gender, style)
+
+    def _refreshed(self, api_key: Optional[str]) -> asyncio.Future:
+        """The refresh in flight, starting one if there is none."""
+        if self._refresh is None:
+            if not api_key:
+                raise ValueError("A Murf API key is required to load the voice catalogue.")
+            self._refresh = asyncio.ensure_future(self._do_refresh(api_key))
+        return asyncio.shield(self._refresh)
+
+    async def _do_refresh(self, api_key: str):
+        try:
+            refreshes.inc()
+            fetched = await executors.run("tts", _fetch, api_key, self._etag, self._last_modified)
+            if fetched is None:
+                raise executors.PoolSaturated("tts pool is saturated")
+            if fetched.not_modified:
+                revalidated.inc()
+            else:
+                self._index(fetched.voices)
+                self._etag, self._last_modified = fetched.etag, fetched.last_modified
+            self._fetched_at = time.monotonic()
+            self._next_refresh = self._fetched_at + self._ttl
+        except Exception as e:
+            refresh_failures.inc()
+            self._next_refresh = time.monotonic() + min(self._ttl, RETRY_INTERVAL)
+            logger.warning(f"Could not refresh the Murf voice catalogue: {e}")
+            if self._fetched_at is None:
+                raise
+        finally:
+            self._refresh = None
+
+    def _index(self, voices: List[Dict[str, Any]]):
+        by_locale, by_gender, by_style = {}, {}, {}
+        for i, voice in enumerate(voices):
+            locales = {voice.get("locale")} | set(voice.get("supportedLocales") or {})
+            for locale in locales:
+                if locale:
+                    by_locale.setdefault(_key(locale), []).append(i)
+            by_gender.setdefault(_key(voice.get("gender")), []).append(i)
+            for style in voice.get("availableStyles") or []:
+                by_style.setdefault(_key(style), []).append(i)
+        # Swapped in together so a lookup never sees a half-built index
+        self._voices, self._by_locale, self._by_gender, self._by_style = voices, by_locale, by_gender, by_style
+        logger.info(f"Voice catalogue loaded: {len(voices)} voices.")
+
+    def _filter(self, locale: Optional[str], gender: Optional[str], style: Optional[str]) -> List[Dict[str, Any]]:
+        selected = None
+        for index, value in ((self._by_locale, locale), (self._by_gender, gender), (self._by_style, style)):
+            if value is None:
+                continue
+            matches = set(index.get(_key(value), ()))
+            selected = matches if selected is None else selected & matches
+        if selected is None:
+            return self._voices
+        return [self._voices[i] for i in sorted(selected)]
+
+
+catalog = VoiceCatalog(config.VOICES_TTL)
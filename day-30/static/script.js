@@ -340,6 +340,19 @@ document.addEventListener("DOMContentLoaded", () => {
 
     let audioQueue = [];
     let isPlaying = false;
+    let currentSource = null;
+    // Bumped on every flush so audio decoded for an interrupted turn is dropped
+    let playbackGeneration = 0;
+    // Binary audio frames of turns below minTurnId are left over from a flushed turn
+    let latestTurnId = 0;
+    let minTurnId = 0;
+    // Binary frame header: turn id (uint32), sequence (uint32), codec (uint8), flags (uint8)
+    const FRAME_HEADER_BYTES = 10;
+    const CODEC_PCM16 = 2;
+    // Raw PCM frames are scheduled back to back on one timeline instead of decoded one by one
+    let pcmFormat = null;
+    let nextPlayTime = 0;
+    let scheduledSources = [];
     let assistantMessageDiv = null;
 
     /* ================= SETTINGS ================= */
@@ -390,23 +403,86 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 
         isPlaying = true;
-        const base64Audio = audioQueue.shift();
-        const audioData = Uint8Array.from(atob(base64Audio), c => c.charCodeAt(0)).buffer;
+        const generation = playbackGeneration;
+        const item = audioQueue.shift();
+        // Binary frames arrive as ArrayBuffers; the legacy JSON transport as base64
+        const audioData = typeof item === "string"
+            ? Uint8Array.from(atob(item), c => c.charCodeAt(0)).buffer
+            : item;
 
         audioContext.decodeAudioData(audioData)
             .then(buffer => {
+                if (generation !== playbackGeneration) return;
                 const source = audioContext.createBufferSource();
                 source.buffer = buffer;
                 source.connect(audioContext.destination);
-                source.onended = playNextInQueue;
+                source.onended = () => {
+                    if (generation === playbackGeneration) playNextInQueue();
+                };
+                currentSource = source;
                 source.start();
             })
             .catch(err => {
                 console.error("Audio decode error:", err);
-                playNextInQueue();
+                if (generation === playbackGeneration) playNextInQueue();
             });
     };
 
+    const schedulePcm = (buffer) => {
+        if (!pcmFormat || !audioContext) return;
+        const samples = new Int16Array(buffer);
+        const channels = pcmFormat.channels;
+        const frames = samples.length / channels;
+        const audioBuffer = audioContext.createBuffer(channels, frames, pcmFormat.sample_rate);
+        for (let ch = 0; ch < channels; ch++) {
+            const data = audioBuffer.getChannelData(ch);
+            for (let i = 0; i < frames; i++) data[i] = samples[i * channels + ch] / 32768;
+        }
+
+        const source = audioContext.createBufferSource();
+        source.buffer = audioBuffer;
+        source.connect(audioContext.destination);
+        // A small lead absorbs network jitter when playback has caught up with the stream
+        nextPlayTime = Math.max(nextPlayTime, audioContext.currentTime + 0.05);
+        source.start(nextPlayTime);
+        nextPlayTime += audioBuffer.duration;
+        scheduledSources.push(source);
+        source.onended = () => {
+            scheduledSources = scheduledSources.filter(s => s !== source);
+        };
+    };
+
+    // Barge-in: the server cancelled the turn, so stop speaking immediately
+    const flushAudio = () => {
+        playbackGeneration++;
+        minTurnId = latestTurnId + 1;
+        audioQueue = [];
+        isPlaying = false;
+        scheduledSources.forEach(s => {
+            try { s.stop(); } catch (e) { /* already stopped */ }
+        });
+        scheduledSources = [];
+        nextPlayTime = 0;
+        if (currentSource) {
+            try { currentSource.stop(); } catch (e) { /* already stopped */ }
+            currentSource = null;
+        }
+    };
+
+    const handleAudioFrame = (frame) => {
+        const header = new DataView(frame, 0, FRAME_HEADER_BYTES);
+        const turnId = header.getUint32(0);
+        if (turnId < minTurnId) return;
+        latestTurnId = Math.max(latestTurnId, turnId);
+        if (frame.byteLength === FRAME_HEADER_BYTES) return;  // Empty final frame: the turn is complete
+        if (header.getUint8(8) === CODEC_PCM16) {
+            schedulePcm(frame.slice(FRAME_HEADER_BYTES));
+            return;
+        }
+        audioQueue.push(frame.slice(FRAME_HEADER_BYTES));
+        if (!isPlaying) playNextInQueue();
+    };
+
     /* ================= RECORDING ================= */
 
     const startRecording = async () => {
@@ -435,16 +511,27 @@ document.addEventListener("DOMContentLoaded", () => {
             /* ===== WebSocket ===== */
             const protocol = window.location.protocol === "https:" ? "wss" : "ws";
             ws = new WebSocket(`${protocol}://${window.location.host}/ws`);
+            ws.binaryType = "arraybuffer";
 
             ws.onopen = () => {
                 console.log("WebSocket connected");
                 wsReady = true;
 
                 ws.send(JSON.stringify({ type: "start" }));
-                ws.send(JSON.stringify({ type: "config", keys: apiKeys }));
+                ws.send(JSON.stringify({
+                    type: "config",
+                    keys: apiKeys,
+                    audio: { transport: "binary", codec: "pcm16" },
+                    // The browser may ignore the 16 kHz hint; the server resamples what it actually captures
+                    input: { sample_rate: audioContext.sampleRate, channels: 1 },
+                }));
             };
 
             ws.onmessage = (event) => {
+                if (event.data instanceof ArrayBuffer) {
+                    handleAudioFrame(event.data);
+                    return;
+                }
                 const msg = JSON.parse(event.data);
 
                 if (msg.type === "assistant") {
@@ -454,6 +541,10 @@ document.addEventListener("DOMContentLoaded", () => {
                 } else if (msg.type === "audio") {
                     audioQueue.push(msg.b64);
                     if (!isPlaying) playNextInQueue();
+                } else if (msg.type === "audio_format") {
+                    pcmFormat = msg;
+                } else if (msg.type === "flush") {
+                    flushAudio();
                 }
             };
 
@@ -494,8 +585,7 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 
         wsReady = false;
-        audioQueue = [];
-        isPlaying = false;
+        flushAudio();
 
         isRecording = false;
         recordBtn.classList.remove("recording");